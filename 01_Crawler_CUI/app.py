@@ -1,3 +1,7 @@
+# 標準ライブラリ
+import argparse
+import multiprocessing
+
 # 自己定義のモジュール
 from crawler import Crawler
 
@@ -5,10 +9,51 @@ from crawler import Crawler
 def main():
     """プログラム全体の開始処理"""
 
+    # コマンドライン引数の定義
+    parser = argparse.ArgumentParser(description='Crawler CUI')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='前回中断した処理の途中経過から再開')
+    parser.add_argument(
+        '--import-cache', action='store_true',
+        help='既存のキャッシュディレクトリをsqliteのキャッシュに取り込み')
+    parser.add_argument(
+        '--offline', action='store_true',
+        help='ネットワークを使用せず、キャッシュのみから処理(再実行/ベンチマーク用)')
+    parser.add_argument(
+        '--tolerant', action='store_true',
+        help='URL単位のエラーで処理を中止せず、dead letterに記録して継続')
+    parser.add_argument(
+        '--retry-dead-letter', action='store_true',
+        help='dead letterに記録したリクエストのみを再実行')
+    parser.add_argument(
+        '--extract-images', metavar='DIR',
+        help='画像のパックを画像ごとのファイルとしてディレクトリに書き出し')
+    args = parser.parse_args()
+
     # Crawlerモジュールを呼び出してスクレイピング処理を実行
     crawler = Crawler()
-    crawler.run_crawler()
+    # オフラインで処理する場合
+    if args.offline:
+        crawler.offline = True
+    # 許容モードで処理する場合
+    if args.tolerant:
+        crawler.tolerant = True
+
+    # キャッシュの取り込みのみ行う場合
+    if args.import_cache:
+        crawler.import_file_cache()
+        return
+    # 画像のパックの書き出しのみ行う場合
+    if args.extract_images:
+        crawler.extract_image_pack(args.extract_images)
+        return
+
+    crawler.run_crawler(
+        resume=args.resume, retry_dead_letter=args.retry_dead_letter)
 
 
 if __name__ == '__main__':
+    # 実行ファイル(cx-Freeze)でHTMLの解析用のプロセスを起動できるようにする
+    multiprocessing.freeze_support()
     main()
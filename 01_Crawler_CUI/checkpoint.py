@@ -0,0 +1,167 @@
+# 標準ライブラリ
+from collections import defaultdict
+import json
+import os
+import sqlite3
+
+# 自己定義モジュール
+from frontier import CrawlRequest
+
+
+class Checkpoint(object):
+    """
+    crawlの途中経過の保存/復元
+
+    Note:
+        途中経過は以下のテーブルとして1つのSQLiteファイルに保存。
+            meta: 実行日時や処理結果のカウント
+            pending: 処理待ち/再試行待ちのリクエスト(frontier)
+            visited: 取得済みURL(VisitedSetの退避先から前回の保存以降に退避された分を書き込み)
+            items: 抽出済みのスクレイピングデータ(spiderごと)
+            images: 保存済みの画像のメタデータ(spiderごと、画像データ自体は出力先に保存済み)
+        スクレイピングデータと画像のメタデータは前回の保存以降に追加された分のみ書き込む。
+        取得済みURLは処理待ちのリクエストと同じトランザクションで書き込むため、
+        強制終了された場合も保存されていないリクエストのURLが取得済みとして復元されることはない。
+    """
+
+    def __init__(self, path):
+        # 保存先のファイルパス
+        self.path = path
+        # SQLiteの接続
+        self.db = None
+        # spiderごとの保存済みのスクレイピングデータ数
+        self.saved_items = defaultdict(int)
+        # spiderごとの保存済みの画像データ数
+        self.saved_images = defaultdict(int)
+        # 保存済みの取得済みURLの退避の順番(VisitedSetのrowid)
+        self.saved_visited = 0
+
+    def exists(self):
+        """途中経過の有無を確認"""
+
+        return os.path.exists(self.path)
+
+    def open(self):
+        """保存先への接続/テーブルの作成"""
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # 保存済みの件数を初期化(再開時はload()で更新)
+        self.saved_items = defaultdict(int)
+        self.saved_images = defaultdict(int)
+        self.saved_visited = 0
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS pending '
+                '(seq INTEGER PRIMARY KEY, url TEXT, page_type TEXT, meta TEXT, '
+                'attempt INTEGER, not_before REAL, spider TEXT)')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY)')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS items '
+                '(seq INTEGER PRIMARY KEY, spider TEXT, data TEXT)')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS images '
+                '(spider TEXT, url TEXT, data TEXT, PRIMARY KEY (spider, url))')
+
+    def save(self, date_time, result_count, requests, visited, spider_items):
+        """途中経過の保存(spider_itemsはspider名と(スクレイピングデータ, 画像のメタデータ)の対応)"""
+
+        # メモリ上の取得済みURLを退避し、前回の保存以降に退避された分を取得
+        visited.spill()
+        spilled = visited.spilled_since(self.saved_visited)
+
+        with self.db:
+            # 実行日時と処理結果のカウント
+            self.db.executemany(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                [('date_time', date_time),
+                 ('result_count', json.dumps(result_count))])
+            # 処理待ちのリクエストは毎回すべて書き換え
+            self.db.execute('DELETE FROM pending')
+            self.db.executemany(
+                'INSERT INTO pending (url, page_type, meta, attempt, not_before, spider) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                ((request.url, request.page_type, json.dumps(request.meta),
+                  request.attempt, request.not_before, request.spider)
+                 for request in requests))
+            # 前回の保存以降の取得済みURL
+            self.db.executemany(
+                'INSERT OR IGNORE INTO visited (url) VALUES (?)',
+                ((url,) for _, url in spilled))
+            for spider, (items, img_data) in spider_items.items():
+                # 前回の保存以降に追加されたスクレイピングデータ
+                self.db.executemany(
+                    'INSERT INTO items (spider, data) VALUES (?, ?)',
+                    ((spider, json.dumps(data))
+                     for data in items[self.saved_items[spider]:]))
+                # 前回の保存以降に追加された画像のメタデータ(dictは追加順を保持)
+                self.db.executemany(
+                    'INSERT OR IGNORE INTO images (spider, url, data) VALUES (?, ?, ?)',
+                    ((spider, url, json.dumps(data))
+                     for url, data in list(img_data.items())[self.saved_images[spider]:]))
+        for spider, (items, img_data) in spider_items.items():
+            self.saved_items[spider] = len(items)
+            self.saved_images[spider] = len(img_data)
+        if spilled:
+            self.saved_visited = spilled[-1][0]
+
+    def load(self):
+        """途中経過の読み込み(保存されていない場合はNoneを返す)"""
+
+        meta = dict(self.db.execute('SELECT key, value FROM meta'))
+        if 'date_time' not in meta:
+            return None
+
+        # 処理結果のカウント(json化でstr型になったステータスコードをint型に戻す)
+        result_count = json.loads(meta['result_count'])
+        result_count['ステータスコード'] = defaultdict(int, {
+            int(k): v for k, v in result_count['ステータスコード'].items()})
+
+        requests = [
+            CrawlRequest(
+                url, page_type, json.loads(request_meta), attempt, not_before, spider)
+            for url, page_type, request_meta, attempt, not_before, spider
+            in self.db.execute(
+                'SELECT url, page_type, meta, attempt, not_before, spider '
+                'FROM pending ORDER BY seq')]
+        # spiderごとのスクレイピングデータと画像のメタデータ
+        items = defaultdict(list)
+        for spider, data in self.db.execute('SELECT spider, data FROM items ORDER BY seq'):
+            items[spider].append(json.loads(data))
+        img_data = defaultdict(dict)
+        for spider, url, data in self.db.execute('SELECT spider, url, data FROM images'):
+            img_data[spider][url] = json.loads(data)
+        self.saved_items = defaultdict(
+            int, {spider: len(data) for spider, data in items.items()})
+        self.saved_images = defaultdict(
+            int, {spider: len(data) for spider, data in img_data.items()})
+
+        return {
+            'date_time': meta['date_time'],
+            'result_count': result_count,
+            'requests': requests,
+            'items': items,
+            'img_data': img_data,
+        }
+
+    def load_visited(self, visited):
+        """保存された取得済みURLをVisitedSetに復元(以降の保存は復元後に追加された分のみ)"""
+
+        visited.restore(url for url, in self.db.execute('SELECT url FROM visited'))
+        self.saved_visited = visited.last_seq()
+
+    def close(self):
+        """保存先の切断"""
+
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def clear(self):
+        """途中経過の削除(正常終了時/再開しない場合)"""
+
+        self.close()
+        if self.exists():
+            os.remove(self.path)
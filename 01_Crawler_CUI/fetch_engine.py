@@ -0,0 +1,89 @@
+# 標準ライブラリ
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+class FetchEngine(object):
+    """
+    asyncioによるリクエストの並行処理を定義
+
+    Note:
+        event loopは専用のスレッド(デーモン)で常駐させ、
+        crawler側のスレッドからはrun()/gather()でコルーチンを渡して結果を待機する。
+
+        requestsは同期処理のため、実際の送信はThreadPoolExecutorで実行し、
+        同時リクエスト数(in-flight)はasyncio.Semaphoreで制限する。
+
+        画像等の優先度の低いリクエストはrun_background()で実行し、
+        同時リクエスト数(background_concurrency)を別枠とすることで通常のリクエストを妨げない。
+    """
+
+    def __init__(self, concurrency=4, background_concurrency=0):
+        # 同時リクエスト数の上限
+        self.concurrency = concurrency
+        # バックグラウンドの同時リクエスト数の上限
+        self.background_concurrency = background_concurrency
+        # 専用のevent loopを定義
+        self.loop = asyncio.new_event_loop()
+        # 同期処理(requests)を実行するスレッドプール(バックグラウンドの分を含む)
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency + background_concurrency)
+        # 同時リクエスト数の制御(event loop上で生成するため初回使用時に定義)
+        self.semaphore = None
+        self.background_semaphore = None
+
+        # event loopを常駐させるスレッドの定義/開始
+        self.loop_thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True)
+        self.loop_thread.start()
+
+    def run(self, coro):
+        """コルーチンをevent loopで実行して結果を待機"""
+
+        # 別スレッドのevent loopにコルーチンを渡す
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        # 結果(もしくは例外)を呼び出し元に返す
+        return future.result()
+
+    def gather(self, coros):
+        """複数のコルーチンを並行実行して結果を順番通りに返す"""
+
+        return self.run(self.gather_async(coros))
+
+    async def gather_async(self, coros):
+        """gather()のevent loop側の処理"""
+
+        # コルーチンをタスク化して並行実行
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            return await asyncio.gather(*tasks)
+        # いずれかのタスクで例外が発生した場合
+        except BaseException:
+            # 残りのタスクを取消して例外を呼び出し元に伝える
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """同期処理をスレッドプールで実行(同時実行数を制限)"""
+
+        # event loop上でSemaphoreを定義
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self.semaphore:
+            return await self.loop.run_in_executor(
+                self.executor, lambda: func(*args, **kwargs))
+
+    async def run_background(self, func, *args, **kwargs):
+        """優先度の低い同期処理をスレッドプールで実行(同時実行数は別枠で制限)"""
+
+        # event loop上でSemaphoreを定義
+        if self.background_semaphore is None:
+            self.background_semaphore = asyncio.Semaphore(
+                max(1, self.background_concurrency))
+
+        async with self.background_semaphore:
+            return await self.loop.run_in_executor(
+                self.executor, lambda: func(*args, **kwargs))
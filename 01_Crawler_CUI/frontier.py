@@ -0,0 +1,229 @@
+# 標準ライブラリ
+from collections import deque
+import heapq
+import itertools
+import os
+import sqlite3
+import tempfile
+import time
+
+# 自己定義モジュール
+from url_canonicalizer import canonicalize_url
+
+
+class CrawlRequest(object):
+    """frontierで管理するリクエスト(URLとページ種別)"""
+
+    def __init__(self, url, page_type, meta=None, attempt=0, not_before=0, spider=None):
+        # リクエストURL
+        self.url = url
+        # ページ種別(レスポンスの処理方法の判定に使用)
+        self.page_type = page_type
+        # ページ数など、処理に必要な付加情報
+        self.meta = meta or {}
+        # 再試行の回数(一時的なエラーによる再追加のたびに加算)
+        self.attempt = attempt
+        # 再試行時刻(この時刻まではリクエストを送らない)
+        self.not_before = not_before
+        # リクエストを追加したspider名(レスポンスの処理を行うspiderの判定に使用)
+        self.spider = spider
+
+
+class VisitedSet(object):
+    """
+    正規化URLによる取得済みURLの管理
+
+    Note:
+        memory_limitまではメモリ上のsetで保持し、
+        上限に達した時点でSQLite(一時ファイル)に退避してsetを空にする。
+        大量のURLをcrawlする場合もメモリ使用量はmemory_limit分に収まる。
+
+        退避先は途中経過の保存先とは別のファイルとし、close()で削除する。
+        (途中経過には保存時にcheckpointモジュールが処理待ちのリクエストと同時に書き込むため、
+         保存前に退避したURLが途中経過に含まれることはない)
+    """
+
+    def __init__(self, memory_limit=100000):
+        # メモリ上で保持する上限
+        self.memory_limit = memory_limit
+        # メモリ上の取得済みURL
+        self.memory = set()
+        # 退避先のSQLite(初回の退避時に生成)
+        self.db = None
+        self.db_path = None
+        # 退避済みの件数
+        self.spilled_count = 0
+
+    def connect(self):
+        """退避先のSQLite(一時ファイル)の生成"""
+
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute('CREATE TABLE visited (url TEXT PRIMARY KEY)')
+
+    def __contains__(self, url):
+        if url in self.memory:
+            return True
+        # 退避済みのURLを確認
+        if self.db:
+            row = self.db.execute(
+                'SELECT 1 FROM visited WHERE url = ?', (url,)).fetchone()
+            return row is not None
+        return False
+
+    def __len__(self):
+        return len(self.memory) + self.spilled_count
+
+    def add(self, url):
+        """取得済みURLとして追加"""
+
+        self.memory.add(url)
+        # メモリ上の上限に達した場合は退避
+        if len(self.memory) >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """メモリ上の取得済みURLをSQLiteに退避"""
+
+        self.insert(self.memory)
+        self.memory.clear()
+
+    def restore(self, urls):
+        """途中経過に保存された取得済みURLを退避先に読み込み"""
+
+        self.insert(urls)
+
+    def insert(self, urls):
+        """退避先への一括追加(初回の退避時に一時ファイルとしてSQLiteを生成)"""
+
+        if not self.db:
+            self.connect()
+
+        with self.db:
+            self.db.executemany(
+                'INSERT OR IGNORE INTO visited (url) VALUES (?)',
+                ((url,) for url in urls))
+        self.spilled_count = self.db.execute(
+            'SELECT COUNT(*) FROM visited').fetchone()[0]
+
+    def spilled_since(self, seq):
+        """
+        退避の順番(rowid)がseqより後の(順番, URL)のリスト
+
+        Note:
+            途中経過の保存時に前回の保存以降に退避されたURLのみを書き込むために使用。
+        """
+
+        if not self.db:
+            return []
+        return self.db.execute(
+            'SELECT rowid, url FROM visited WHERE rowid > ? ORDER BY rowid',
+            (seq,)).fetchall()
+
+    def last_seq(self):
+        """退避の順番(rowid)の最大値(退避していない場合は0)"""
+
+        if not self.db:
+            return 0
+        return self.db.execute(
+            'SELECT COALESCE(MAX(rowid), 0) FROM visited').fetchone()[0]
+
+    def close(self):
+        """退避先のSQLiteの削除"""
+
+        if self.db:
+            self.db.close()
+            os.remove(self.db_path)
+            self.db = None
+
+
+class Frontier(object):
+    """
+    crawl予定のリクエストと取得済みURLの一元管理
+
+    Note:
+        追加(push)時点で取得済みURLとして登録するため、
+        処理待ち/処理中のURLも含めて同じURLを二重に取得することはない。
+
+        一時的なエラーで再試行するリクエストは再試行時刻の順にヒープで保持し、
+        再試行時刻に達したものから処理待ちのリクエストより優先して取り出す。
+    """
+
+    def __init__(self, visited):
+        # 処理待ちのリクエスト
+        self.pending = deque()
+        # 再試行待ちのリクエスト((再試行時刻, 追加順, リクエスト)のヒープ)
+        self.delayed = []
+        # 再試行時刻が同じ場合に追加順で取り出すための連番
+        self.sequence = itertools.count()
+        # 取得済みURL(VisitedSet)
+        self.visited = visited
+
+    def __len__(self):
+        return len(self.pending) + len(self.delayed)
+
+    def visit(self, url):
+        """取得済みURLとして登録(取得済みURLの場合はFalseを返す)"""
+
+        # 重複判定用の正規化URL
+        key = canonicalize_url(url)
+        if key in self.visited:
+            return False
+
+        self.visited.add(key)
+        return True
+
+    def push(self, request):
+        """リクエストの追加(取得済みURLの場合はFalseを返す)"""
+
+        if not self.visit(request.url):
+            return False
+
+        self.pending.append(request)
+        return True
+
+    def defer(self, request):
+        """再試行するリクエストの追加(再試行時刻まで取り出さない)"""
+
+        heapq.heappush(
+            self.delayed, (request.not_before, next(self.sequence), request))
+
+    def restore(self, requests):
+        """保存した処理待ちのリクエストを復元(取得済みURLの判定は行わない)"""
+
+        for request in requests:
+            # 再試行待ちだったリクエスト
+            if request.not_before:
+                self.defer(request)
+            else:
+                self.pending.append(request)
+
+    def pop_batch(self, size):
+        """
+        処理待ちのリクエストを指定数まで取り出す
+
+        Note:
+            再試行待ちのリクエストのみで、再試行時刻に達したものがない場合は空のリストを返す。
+        """
+
+        batch = []
+        now = time.time()
+        # 再試行時刻に達したリクエストを優先
+        while self.delayed and self.delayed[0][0] <= now and len(batch) < size:
+            batch.append(heapq.heappop(self.delayed)[2])
+        while self.pending and len(batch) < size:
+            batch.append(self.pending.popleft())
+        return batch
+
+    def wait_time(self):
+        """次の再試行時刻までの秒数(再試行待ちのリクエストがない場合は0)"""
+
+        if not self.delayed:
+            return 0
+        return max(0, self.delayed[0][0] - time.time())
+
+    def requests(self):
+        """処理待ちと再試行待ちのすべてのリクエスト(途中経過の保存用)"""
+
+        return list(self.pending) + [entry[2] for entry in sorted(self.delayed)]
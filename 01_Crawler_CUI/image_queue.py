@@ -0,0 +1,58 @@
+# 標準ライブラリ
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class ImageQueue(object):
+    """
+    画像のバックグラウンド取得の管理
+
+    Note:
+        画像の取得はfetch_engineモジュールのevent loopにタスクとして渡し、
+        crawler側のスレッドは完了を待たずにページの処理を継続する。
+        取得結果はcrawler側のスレッドでpop_done()により受け取り、
+        スクレイピングデータ等の更新はcrawler側のスレッドのみで行う。
+    """
+
+    def __init__(self, fetch_engine):
+        # タスクを実行するfetch_engineモジュール
+        self.fetch_engine = fetch_engine
+        # 取得中のリクエストとタスク(concurrent.futures.Future)
+        self.tasks = []
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def submit(self, request, coro):
+        """画像の取得(コルーチン)をタスクとして追加"""
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.fetch_engine.loop)
+        self.tasks.append((request, future))
+
+    def pop_done(self):
+        """完了したタスクの(リクエスト, 取得結果)を取り出す"""
+
+        done = [(request, future) for request, future in self.tasks if future.done()]
+        self.tasks = [
+            (request, future) for request, future in self.tasks if not future.done()]
+        # タスク内で想定外の例外が発生していた場合はここで送出
+        return [(request, future.result()) for request, future in done]
+
+    def wait(self, timeout=None):
+        """いずれかのタスクが完了するまで待機"""
+
+        if self.tasks:
+            wait([future for _, future in self.tasks],
+                 timeout=timeout, return_when=FIRST_COMPLETED)
+
+    def requests(self):
+        """取得中のリクエスト(途中経過の保存用)"""
+
+        return [request for request, _ in self.tasks]
+
+    def cancel(self):
+        """取得中のタスクの取消(処理の中断時)"""
+
+        for _, future in self.tasks:
+            future.cancel()
+        self.tasks = []
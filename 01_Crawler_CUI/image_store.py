@@ -0,0 +1,169 @@
+# 標準ライブラリ
+from concurrent.futures import ThreadPoolExecutor, wait
+import hashlib
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+# 自己定義モジュール
+from image_pack import EXTENSION_SIZE, ImagePackWriter
+
+
+class ImageStore(object):
+    """
+    画像データのハッシュ値(sha256)による保存
+
+    Note:
+        画像は以下のパスに保存し、実行をまたいで同じ保存先を使用。
+            {root}/{ハッシュ値の先頭2文字}/{ハッシュ値}.{拡張子}
+        同じ内容の画像は同じパスとなるため、既に保存済みの場合は書き込まない。
+
+        受信中の画像は{root}/tmpに一時ファイルとして書き込み(ハッシュ値も同時に算出)、
+        確定(保存済みの確認と一時ファイルの移動)はスレッドプールで行う(write-behind)。
+
+        packがTrueの場合は画像ごとのファイルではなく、{root}/images.blob(本体)に追記し、
+        {root}/images.idx(インデックス)にハッシュ値と位置を記録する(image_packモジュール)。
+    """
+
+    def __init__(self, root, workers=2, pack=False):
+        # 保存先のディレクトリ
+        self.root = root
+        # 画像のパックへの保存フラグ
+        self.pack = pack
+        # パックのファイルパス(拡張子なし)
+        self.pack_path = f'{root}/images'
+        # パックの書き込み(prepare()で生成)
+        self.pack_writer = None
+        # 受信中の一時ファイルのディレクトリ
+        self.tmp_dir = f'{root}/tmp'
+        # 確定処理を行うスレッドプール
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # 確定処理中のタスク
+        self.futures = []
+        # 新規に保存した件数/保存済みのため書き込まなかった件数
+        self.stored_count = 0
+        self.duplicate_count = 0
+        # 確定処理の排他制御用のロック
+        self.lock = threading.Lock()
+
+    def prepare(self):
+        """保存先の作成(中断等で残った一時ファイルは削除)"""
+
+        # 件数の初期化
+        self.stored_count = 0
+        self.duplicate_count = 0
+
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        for file_name in os.listdir(self.tmp_dir):
+            if file_name.endswith('.part'):
+                os.remove(os.path.join(self.tmp_dir, file_name))
+
+        # パックに保存する場合は前回までのインデックスを読み込んで追記
+        if self.pack and not self.pack_writer:
+            self.pack_writer = ImagePackWriter(self.pack_path)
+
+    def get_path(self, digest, extension):
+        """ハッシュ値に対応する保存パス"""
+
+        return f'{self.root}/{digest[:2]}/{digest}{extension}'
+
+    def stream(self, r, max_size, chunk_size=64 * 1024):
+        """
+        画像データを分割して一時ファイルに書き込み、(一時ファイルのパス, サイズ, ハッシュ値)を返す
+
+        Note:
+            画像データ全体をメモリ上に保持しないよう、受信した分から順に書き込む。
+            サイズがmax_sizeを超えた場合は一時ファイルを削除してNoneを返す。
+        """
+
+        # Content-Lengthで上限を超えることがわかる場合は受信しない
+        if int(r.headers.get('Content-Length') or 0) > max_size:
+            r.close()
+            return None
+
+        fd, temp_path = tempfile.mkstemp(suffix='.part', dir=self.tmp_dir)
+        size = 0
+        sha256 = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in r.iter_content(chunk_size):
+                    size += len(chunk)
+                    # 上限を超えた時点で受信を中止
+                    if size > max_size:
+                        break
+                    sha256.update(chunk)
+                    f.write(chunk)
+        # 受信中のエラーの場合は書きかけの一時ファイルを残さない
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        finally:
+            r.close()
+
+        if size > max_size:
+            os.remove(temp_path)
+            return None
+        return temp_path, size, sha256.hexdigest()
+
+    def put(self, url, temp_path, size, digest):
+        """一時ファイルの確定をスレッドプールに渡し、画像のメタデータを返す"""
+
+        # URLの拡張子(ない場合/ASCII以外やパックのインデックスに収まらない場合はjpg)
+        extension = os.path.splitext(urlparse(url).path)[1]
+        if not extension or not extension.isascii() or len(extension) > EXTENSION_SIZE:
+            extension = '.jpg'
+        # パックに保存する場合は本体のパス(画像はハッシュ値で参照)
+        if self.pack:
+            self.futures.append(self.executor.submit(
+                self.commit_pack, temp_path, digest, extension))
+            return {'hash': digest, 'path': f'{self.pack_path}.blob', 'size': size}
+
+        path = self.get_path(digest, extension)
+        self.futures.append(
+            self.executor.submit(self.commit, temp_path, path))
+        return {'hash': digest, 'path': path, 'size': size}
+
+    def commit_pack(self, temp_path, digest, extension):
+        """一時ファイルの内容をパックに追記して削除(保存済みの場合は削除のみ)"""
+
+        # パックへの追記は1件ずつ行うため排他制御
+        with self.lock:
+            if self.pack_writer.append(digest, temp_path, extension):
+                self.stored_count += 1
+            else:
+                self.duplicate_count += 1
+        os.remove(temp_path)
+
+    def commit(self, temp_path, path):
+        """一時ファイルの確定(保存済みの場合は一時ファイルを削除)"""
+
+        # 同じ内容の画像を同時に確定する場合に備えて排他制御
+        with self.lock:
+            if os.path.exists(path):
+                os.remove(temp_path)
+                self.duplicate_count += 1
+                return
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            self.stored_count += 1
+
+    def flush(self):
+        """確定処理中のタスクの完了を待機(例外が発生していた場合は送出)"""
+
+        futures, self.futures = self.futures, []
+        wait(futures)
+        for future in futures:
+            future.result()
+
+        # パックに保存する場合はインデックスを書き直す
+        if self.pack_writer:
+            self.pack_writer.sync()
+
+    def close(self):
+        """パックの書き込みを終了"""
+
+        if self.pack_writer:
+            self.pack_writer.close()
+            self.pack_writer = None
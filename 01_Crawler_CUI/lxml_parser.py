@@ -0,0 +1,177 @@
+# 標準ライブラリ
+import re
+
+# 外部ライブラリ
+from lxml import etree
+import lxml.html
+
+
+# 複数の値を空白区切りで持つ属性(BeautifulSoupと同様にリストとして返す)
+MULTI_VALUED_ATTRIBUTES = ('class', 'rel', 'rev', 'accept-charset', 'headers', 'accesskey')
+
+# cssセレクターの構成要素(結合子/タグ名/クラス/:-soup-contains)
+SELECTOR_TOKEN = re.compile(
+    r'\s*(?P<combinator>[>+])\s*|(?P<space>\s+)|(?P<tag>[A-Za-z][\w-]*|\*)'
+    r'|\.(?P<class>[\w-]+)|:-soup-contains\((?P<quote>["\'])(?P<text>.*?)(?P=quote)\)')
+
+# 先頭のXML宣言(encodingを含む場合、lxmlは文字列(str)として解析できない)
+XML_DECLARATION = re.compile(r'^\ufeff?\s*<\?xml[^>]*\?>')
+
+# 変換済みのXPath(cssセレクターごとに1回のみコンパイル)
+compiled_xpaths = {}
+
+
+def xpath_literal(text):
+    """
+    文字列をXPathの文字列リテラルに変換
+
+    Note:
+        XPath 1.0の文字列リテラルにはエスケープがないため、
+        「"」を含む場合は「'」で囲み、両方を含む場合はconcat()で連結する。
+    """
+
+    if '"' not in text:
+        return f'"{text}"'
+    if "'" not in text:
+        return f"'{text}'"
+    # 「"」で分割し、分割箇所に「'"'」を挟んで連結
+    separator = ', \'"\', '
+    return 'concat(' + separator.join(f'"{part}"' for part in text.split('"')) + ')'
+
+
+def css_to_xpath(selector):
+    """
+    cssセレクターをXPathに変換
+
+    Note:
+        crawlerで使用する範囲(タグ名/クラス/:-soup-contains/子孫・子・隣接の結合子)のみ対応し、
+        それ以外の構文の場合はValueErrorを送出する。
+    """
+
+    xpath = './/'
+    # 直前の結合子(先頭は子孫)
+    combinator = ' '
+    # 現在の要素のタグ名/条件
+    tag, predicates = None, []
+
+    def flush():
+        """現在の要素をXPathのステップとして追加"""
+
+        if combinator == '+':
+            step = '/following-sibling::*[1]'
+            if tag and tag != '*':
+                predicates.insert(0, f'[self::{tag}]')
+            return step + ''.join(predicates)
+        step = {' ': '//', '>': '/'}[combinator] if xpath != './/' else ''
+        return step + (tag or '*') + ''.join(predicates)
+
+    position = 0
+    selector = selector.strip()
+    while position < len(selector):
+        m = SELECTOR_TOKEN.match(selector, position)
+        if not m or m.end() == position:
+            raise ValueError(f'対応していないcssセレクターです: {selector}')
+        position = m.end()
+
+        # 結合子の場合は現在の要素を確定
+        if m.group('combinator') or m.group('space'):
+            xpath += flush()
+            combinator = m.group('combinator') or ' '
+            tag, predicates = None, []
+        elif m.group('tag'):
+            tag = m.group('tag')
+        elif m.group('class'):
+            predicates.append(
+                '[contains(concat(" ", normalize-space(@class), " "), '
+                f'" {m.group("class")} ")]')
+        else:
+            predicates.append(f'[contains(string(.), {xpath_literal(m.group("text"))})]')
+    return xpath + flush()
+
+
+def cut_region(text, names):
+    """
+    HTMLから指定したタグを含む範囲(最初の開始タグから最後の終了タグまで)を切り出す
+
+    Note:
+        属性やタグの入れ子は考慮しない(該当する要素を必ず含む範囲となる)ため、
+        切り出した範囲にも同じcssセレクターを使用できる。
+        開始タグもしくは終了タグが見つからない場合は全体を返す。
+    """
+
+    pattern = '|'.join(re.escape(name) for name in names)
+    start = re.search(rf'<(?:{pattern})[\s/>]', text, re.IGNORECASE)
+    if not start:
+        return text
+    # 最後の終了タグ(開始タグ以降の終了タグを順に走査して最後のものを使用)
+    end = None
+    for end in re.finditer(rf'</(?:{pattern})\s*>', text[start.start():], re.IGNORECASE):
+        pass
+    if not end:
+        return text
+    return text[start.start():start.start() + end.end()]
+
+
+def compile_selector(selector):
+    """cssセレクターをXPathに変換してコンパイル(変換済みの場合は再利用)"""
+
+    if selector not in compiled_xpaths:
+        compiled_xpaths[selector] = etree.XPath(css_to_xpath(selector))
+    return compiled_xpaths[selector]
+
+
+class LxmlTag(object):
+    """
+    lxml.htmlの要素をBeautifulSoupのタグと同様に扱うためのラッパー
+
+    Note:
+        crawler/Itemsモジュールで使用する.text/.attrs/select()/select_one()/find()のみ実装。
+        cssセレクターはXPathに変換してコンパイルしたものを使用する。
+    """
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def text(self):
+        return self.element.text_content()
+
+    @property
+    def attrs(self):
+        attrs = dict(self.element.attrib)
+        for name in MULTI_VALUED_ATTRIBUTES:
+            if name in attrs:
+                attrs[name] = attrs[name].split()
+        return attrs
+
+    def select(self, selector):
+        return [LxmlTag(element) for element in compile_selector(selector)(self.element)]
+
+    def select_one(self, selector):
+        elements = compile_selector(selector)(self.element)
+        return LxmlTag(elements[0]) if elements else None
+
+    def find(self, name):
+        element = self.element.find(f'.//{name}')
+        return LxmlTag(element) if element is not None else None
+
+
+class LxmlDocument(LxmlTag):
+    """
+    lxml.htmlによるHTMLの解析結果(BeautifulSoupの代わりに使用)
+
+    Note:
+        namesを指定した場合は該当するタグを含む範囲のみを切り出して解析する(部分解析)。
+    """
+
+    def __init__(self, text, names=None):
+        # 本文は文字列に変換済みのため、XML宣言(XHTML等)は除いて解析
+        text = XML_DECLARATION.sub('', text, count=1)
+        if names:
+            text = cut_region(text, names)
+        try:
+            root = lxml.html.document_fromstring(text)
+        # 本文が空の場合は空のドキュメントとして扱う
+        except etree.ParserError:
+            root = lxml.html.document_fromstring('<html></html>')
+        super().__init__(root)
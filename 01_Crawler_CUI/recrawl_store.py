@@ -0,0 +1,72 @@
+# 標準ライブラリ
+import json
+import sqlite3
+
+
+class RecrawlStore(object):
+    """
+    差分crawl用のバリデーター(ETag/Last-Modified)とスクレイピングデータの保存
+
+    Note:
+        実行をまたいでURLごとに前回のバリデーターとスクレイピングデータを保持。
+        次回のリクエストでは条件付きリクエスト(If-None-Match/If-Modified-Since)を送り、
+        304(Not Modified)もしくはバリデーターが一致した場合はページに変更がないものとして、
+        前回のスクレイピングデータを再利用する。
+    """
+
+    def __init__(self, path):
+        # 保存先のファイルパス
+        self.path = path
+        # 保存先への接続/テーブルの作成
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS pages '
+                '(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, record TEXT)')
+
+    def get(self, url):
+        """URLに対応する保存データ(etag, last_modified, record)を返す"""
+
+        return self.db.execute(
+            'SELECT etag, last_modified, record FROM pages WHERE url = ?',
+            (url,)).fetchone()
+
+    def conditional_headers(self, url):
+        """条件付きリクエストのヘッダーを返す(保存データがない場合は空のdict)"""
+
+        headers = {}
+        row = self.get(url)
+        if not row:
+            return headers
+
+        etag, last_modified, _ = row
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def get_unchanged_record(self, url, r):
+        """ページに変更がない場合は前回のスクレイピングデータを返す(変更がある場合はNone)"""
+
+        row = self.get(url)
+        if not row:
+            return None
+
+        etag, last_modified, record = row
+        # 304もしくはバリデーターが一致する場合(キャッシュの再検証で200になった場合も含む)
+        if r.status_code == 304 or \
+                (etag and r.headers.get('ETag') == etag) or \
+                (last_modified and r.headers.get('Last-Modified') == last_modified):
+            return json.loads(record)
+        return None
+
+    def save(self, url, r, record):
+        """バリデーターとスクレイピングデータの保存"""
+
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, record) '
+                'VALUES (?, ?, ?, ?)',
+                (url, r.headers.get('ETag'), r.headers.get('Last-Modified'),
+                 json.dumps(record)))
@@ -0,0 +1,99 @@
+# 自己定義モジュール
+from extractor import ExtractionPlan
+from items import Items
+
+
+class Spider(object):
+    """
+    crawl対象のサイトごとの定義(spiderの基底クラス)
+
+    Note:
+        サイト固有の設定(開始URL/許可ドメイン/セレクター/スクレイピング項目)と
+        ページ種別ごとの処理はspiderに定義し、crawlerはリクエストの送信/送信間隔/
+        キャッシュ/途中経過の保存等の共通処理のみを行う。
+        crawlerには複数のspiderを登録でき、全spiderのリクエストを同じ
+        frontier/fetch_engine/politenessモジュールで処理する(リクエストはspider名で識別)。
+
+        spiderは以下を定義する。
+            start_requests(): 開始リクエスト(既定は開始URLを'start'のページ種別で追加)
+            parse_{ページ種別}(request, r): ページ種別ごとのレスポンスの処理
+            extraction_spec: 詳細ページのスクレイピング項目の定義(item schema)
+        URLの抽出/スクレイピングはcrawler(self.crawler)の処理を使用し、
+        sitemap/detailのページ種別は基底クラスの処理を共通で使用できる。
+    """
+
+    def __init__(self):
+        # spider名(リクエスト/出力ファイルの識別に使用)
+        self.name = None
+        # スクレイピングの開始URL
+        self.start_url = None
+        # 許可ドメイン
+        self.allowed_domains = []
+        # サイトマップに記載されたURLのうち詳細ページとして取得するURLのパターン
+        # (Noneの場合はサイトマップによるURL検出を行わない)
+        self.sitemap_detail_pattern = None
+        # ページ種別ごとに解析するタグ(タグ名, 属性)、該当しないページ種別は全体を解析
+        self.parse_targets = {}
+        # 一覧系のページ種別ごとに抽出するタグのcssセレクター
+        # (parse_*関数でscrape_page_urlに渡すものと同じ、プロセスプールでの抽出に使用)
+        self.link_selectors = {}
+        # 詳細ページのスクレイピング項目の定義(形式はextractorモジュールのExtractionPlanを参照)
+        self.extraction_spec = None
+        # 画像URLの項目名(画像を取得しない場合はNone)
+        self.image_field = None
+
+        # 登録先のcrawler(open()で設定)
+        self.crawler = None
+        # 抽出計画/スクレイピングデータの格納場所(open()で生成)
+        self.extraction_plan = None
+        self.items = None
+
+    def open(self, crawler):
+        """crawlerへの登録(抽出計画のコンパイル/Itemsモジュールのインスタンス化)"""
+
+        self.crawler = crawler
+        self.extraction_plan = ExtractionPlan(self.extraction_spec, crawler.parser_backend)
+        self.items = Items(crawler.log_handler, self.extraction_plan)
+
+    def start_requests(self):
+        """開始リクエスト((URL, ページ種別, 付加情報)のリスト)"""
+
+        return [(self.start_url, 'start', None)]
+
+    def can_extract(self, page_type):
+        """プロセスプールで解析/抽出できるページ種別かどうか"""
+
+        return page_type in self.link_selectors or page_type == 'detail'
+
+    def push_request(self, url, page_type, meta=None):
+        """このspiderのリクエストとしてfrontierに追加"""
+
+        self.crawler.push_request(url, page_type, meta, self.name)
+
+    def parse_sitemap(self, request, r):
+        """
+        サイトマップの処理(サイトマップインデックスの場合は子のサイトマップ、
+        それ以外の場合は詳細ページのURLを追加)
+        """
+
+        # サイトマップインデックスの場合(解析結果はscrape_page_urlと共有)
+        if self.crawler.parse_document(r, 'xml').find('sitemapindex', recursive=False):
+            # cssセレクター(子のサイトマップのURL)
+            selector = 'sitemapindex > sitemap > loc'
+            for url in self.crawler.scrape_page_url(r, selector, is_xml=True):
+                self.push_request(url, 'sitemap')
+            return
+
+        # cssセレクター(各ページのURL)
+        selector = 'urlset > url > loc'
+        # 詳細ページに該当するURLのみをfrontierに追加
+        for url in self.crawler.scrape_page_url(r, selector, is_xml=True):
+            if self.sitemap_detail_pattern.search(url):
+                self.push_request(url, 'detail')
+                # 処理結果のカウント
+                self.crawler.result_count['サイトマップ検出URL数'] += 1
+
+    def parse_detail(self, request, r):
+        """詳細ページの処理(スクレイピング項目の定義による抽出)"""
+
+        self.crawler.scrape_item(self, request, r)
@@ -0,0 +1,163 @@
+# 標準ライブラリ
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# 外部ライブラリ
+from cachecontrol.cache import BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """
+    CacheControl用のキャッシュ(1つのSQLiteファイルに保存)
+
+    Note:
+        FileCacheはURLごとに1ファイルを生成し削除も行わないため、
+        件数が増えるとディレクトリの探索とディスク使用量が問題になる。
+        本クラスはインデックス付きの1ファイルに以下の形式で保存。
+            key: URLのsha224(FileCacheのファイル名と同じため既存キャッシュを取り込み可能)
+            value: zlibで圧縮したキャッシュデータ
+            accessed: 最終アクセス時刻(LRUによる削除の基準)
+            expires: 有効期限(CacheControlから指定された場合のみ、記録のみ)
+        合計サイズがmax_sizeを超えた場合は、最終アクセスが古いものから削除。
+        有効期限切れでは削除しない(期限切れのキャッシュもETag/Last-Modifiedによる
+        条件付きリクエストの再検証に使用するため、鮮度の判定はCacheControlに任せる)。
+        スレッドプールからの同時アクセスに備えてロックで排他制御。
+    """
+
+    def __init__(self, path, max_size=1024 ** 3, compress_level=6):
+        # 保存先のファイルパス
+        self.path = path
+        # キャッシュ全体の最大サイズ(圧縮後のバイト数)
+        self.max_size = max_size
+        # zlibの圧縮レベル
+        self.compress_level = compress_level
+        # 排他制御用のロック
+        self.lock = threading.Lock()
+
+        # 保存先への接続/テーブルの作成
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        # 書き込み中も読み込みを妨げないようWALモードを使用
+        self.db.execute('PRAGMA journal_mode=WAL')
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS entries '
+                '(key TEXT PRIMARY KEY, value BLOB, size INTEGER, '
+                'accessed REAL, expires REAL)')
+            self.db.execute(
+                'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        # 現在の合計サイズ
+        self.total_size = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    @staticmethod
+    def encode(key):
+        """キーのハッシュ化(FileCacheと同じ方式)"""
+
+        return hashlib.sha224(key.encode()).hexdigest()
+
+    def get(self, key):
+        """キャッシュの取得(最終アクセス時刻を更新)"""
+
+        key = self.encode(key)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                'SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if not row:
+                return None
+
+            with self.db:
+                self.db.execute(
+                    'UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return zlib.decompress(row[0])
+
+    def set(self, key, value, expires=None):
+        """キャッシュの保存(最大サイズを超えた場合は古いものから削除)"""
+
+        self.put(self.encode(key), value, expires)
+
+    def put(self, key, value, expires=None):
+        """ハッシュ化済みのキーによるキャッシュの保存"""
+
+        # 圧縮したキャッシュデータ
+        compressed = zlib.compress(bytes(value), self.compress_level)
+        now = time.time()
+        # CacheControlから指定された有効期限(秒数)を時刻に変換
+        expires_at = now + expires if expires else None
+
+        with self.lock:
+            # 上書きの場合は既存のサイズを差し引く
+            row = self.db.execute(
+                'SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                self.total_size -= row[0]
+
+            with self.db:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO entries '
+                    '(key, value, size, accessed, expires) VALUES (?, ?, ?, ?, ?)',
+                    (key, compressed, len(compressed), now, expires_at))
+            self.total_size += len(compressed)
+            self.evict()
+
+    def delete(self, key):
+        """キャッシュの削除"""
+
+        with self.lock:
+            self.remove(self.encode(key))
+
+    def remove(self, key):
+        """ハッシュ化済みのキーによる削除(ロック取得済みの状態で呼び出す)"""
+
+        row = self.db.execute(
+            'SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+        if row:
+            with self.db:
+                self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self.total_size -= row[0]
+
+    def evict(self):
+        """最大サイズを超えた分を最終アクセスが古いものから削除(ロック取得済みの状態で呼び出す)"""
+
+        while self.total_size > self.max_size:
+            rows = self.db.execute(
+                'SELECT key, size FROM entries ORDER BY accessed LIMIT 100'
+            ).fetchall()
+            if not rows:
+                break
+            with self.db:
+                for key, size in rows:
+                    self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    self.total_size -= size
+                    if self.total_size <= self.max_size:
+                        break
+
+    def import_file_cache(self, cache_dir):
+        """
+        既存のFileCacheのディレクトリを取り込み、取り込んだ件数を返す
+
+        Note:
+            FileCacheのファイル名はキーのsha224のため、そのまま本クラスのキーとして使用。
+            本文を別ファイルに保存する形式(.body)は対象外。
+        """
+
+        count = 0
+        for root, _, files in os.walk(cache_dir):
+            for file_name in files:
+                # sha224(16進数56桁)以外のファイルは対象外
+                if len(file_name) != 56 or '.' in file_name:
+                    continue
+                with open(os.path.join(root, file_name), 'rb') as f:
+                    self.put(file_name, f.read())
+                count += 1
+        return count
+
+    def close(self):
+        """保存先の切断"""
+
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,23 @@
+# 標準ライブラリ
+import os
+import sys
+
+# 外部ライブラリ
+import pytest
+
+# テスト対象のモジュール(crawlerと同じディレクトリ)をimportできるようにする
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# books.toscrape.comのページ(開始/一覧/詳細)を保存したHTML
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture
+def read_page():
+    """ページ種別に対応するHTMLを読み込む関数"""
+
+    def read(page_type):
+        with open(os.path.join(FIXTURE_DIR, f'{page_type}.html'), encoding='utf-8') as f:
+            return f.read()
+    return read
@@ -0,0 +1,116 @@
+# 標準ライブラリ
+from collections import defaultdict
+
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+from checkpoint import Checkpoint
+from frontier import CrawlRequest, VisitedSet
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    """一時ディレクトリに保存する途中経過"""
+
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.sqlite'))
+    checkpoint.open()
+    yield checkpoint
+    checkpoint.close()
+
+
+@pytest.fixture
+def visited():
+    """上限の小さい取得済みURL"""
+
+    visited = VisitedSet(memory_limit=2)
+    yield visited
+    visited.close()
+
+
+def saved_urls(checkpoint):
+    """途中経過に保存された取得済みURL"""
+
+    return {url for url, in checkpoint.db.execute('SELECT url FROM visited')}
+
+
+def test_save_and_load_round_trip(checkpoint, visited):
+    """保存した途中経過を別の接続から同じ内容で読み込めること"""
+
+    result_count = {'ステータスコード': defaultdict(int, {200: 3, 404: 1}), 'リトライ数': 2}
+    requests = [
+        CrawlRequest('https://books.toscrape.com/a', 'detail', spider='books'),
+        CrawlRequest('https://books.toscrape.com/b', 'catalogue', {'page_count': 2},
+                     attempt=1, not_before=123.0, spider='books'),
+    ]
+    items = [{'title': 'A'}]
+    img_data = {'https://books.toscrape.com/a': {'path': 'x.jpg'}}
+    checkpoint.save('20261018000000', result_count, requests, visited,
+                    {'books': (items, img_data)})
+
+    resumed = Checkpoint(checkpoint.path)
+    resumed.open()
+    try:
+        state = resumed.load()
+    finally:
+        resumed.close()
+
+    assert state['date_time'] == '20261018000000'
+    assert state['result_count'] == result_count
+    assert [(r.url, r.page_type, r.meta, r.attempt, r.not_before, r.spider)
+            for r in state['requests']] == [
+        ('https://books.toscrape.com/a', 'detail', {}, 0, 0, 'books'),
+        ('https://books.toscrape.com/b', 'catalogue', {'page_count': 2}, 1, 123.0, 'books')]
+    assert state['items'] == {'books': items}
+    assert state['img_data'] == {'books': img_data}
+
+
+def test_load_without_save_returns_none(checkpoint):
+    """保存前の途中経過は読み込めないこと(最初から処理する)"""
+
+    assert checkpoint.load() is None
+
+
+def test_items_are_appended_incrementally(checkpoint, visited):
+    """2回目以降の保存は前回以降に追加されたスクレイピングデータのみを書き込むこと"""
+
+    items = [{'title': 'A'}]
+    checkpoint.save('20261018000000', {'ステータスコード': {}}, [], visited, {'books': (items, {})})
+    items.append({'title': 'B'})
+    checkpoint.save('20261018000000', {'ステータスコード': {}}, [], visited, {'books': (items, {})})
+
+    assert checkpoint.load()['items'] == {'books': items}
+
+
+def test_visited_is_written_only_on_save(checkpoint, visited):
+    """上限による退避では途中経過に書き込まず、保存時に書き込むこと"""
+
+    for i in range(5):
+        visited.add(f'https://books.toscrape.com/{i}')
+
+    assert visited.spilled_count == 4
+    assert saved_urls(checkpoint) == set()
+
+    checkpoint.save('20261018000000', {'ステータスコード': {}}, [], visited, {})
+
+    assert saved_urls(checkpoint) == {f'https://books.toscrape.com/{i}' for i in range(5)}
+
+
+def test_load_visited_restores_urls_and_saves_only_new_ones(checkpoint, visited):
+    """復元した取得済みURLを判定でき、以降の保存では追加分のみを書き込むこと"""
+
+    visited.add('https://books.toscrape.com/a')
+    checkpoint.save('20261018000000', {'ステータスコード': {}}, [], visited, {})
+
+    resumed = VisitedSet(memory_limit=2)
+    try:
+        checkpoint.load_visited(resumed)
+        assert 'https://books.toscrape.com/a' in resumed
+
+        resumed.add('https://books.toscrape.com/b')
+        assert [url for _, url in resumed.spilled_since(checkpoint.saved_visited)] == []
+        resumed.spill()
+        assert [url for _, url in resumed.spilled_since(checkpoint.saved_visited)] == [
+            'https://books.toscrape.com/b']
+    finally:
+        resumed.close()
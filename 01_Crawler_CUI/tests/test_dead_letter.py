@@ -0,0 +1,65 @@
+# 標準ライブラリ
+import json
+
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+from dead_letter import DeadLetter
+from frontier import CrawlRequest
+
+
+@pytest.fixture
+def dead_letter(tmp_path):
+    """一時ディレクトリに保存するdead letter"""
+
+    return DeadLetter(str(tmp_path / 'dead_letter.jsonl'))
+
+
+def test_round_trip(dead_letter):
+    """記録したリクエストを再実行に必要な情報とともに読み込めること(再試行回数は数え直す)"""
+
+    dead_letter.add(
+        CrawlRequest('https://books.toscrape.com/a', 'catalogue', {'page_count': 2},
+                     attempt=5, spider='books'),
+        '[Crawl] エラー', 'Traceback ...')
+
+    requests = dead_letter.load()
+
+    assert [(r.url, r.page_type, r.meta, r.spider, r.attempt) for r in requests] == [
+        ('https://books.toscrape.com/a', 'catalogue', {'page_count': 2}, 'books', 0)]
+
+
+def test_record_keeps_reason_and_traceback(dead_letter):
+    """エラーメッセージとエラー発生箇所を1行のJSONとして追記すること"""
+
+    request = CrawlRequest('https://books.toscrape.com/a', 'detail')
+    dead_letter.add(request, '[Crawl] エラー', 'Traceback ...')
+    dead_letter.add(request, '[Crawl] 再発', 'Traceback ...')
+
+    with open(dead_letter.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['reason'] for record in records] == ['[Crawl] エラー', '[Crawl] 再発']
+    assert records[0]['traceback'] == 'Traceback ...'
+
+
+def test_load_keeps_last_record_per_url(dead_letter):
+    """同じURLは最後の記録のみを読み込み、記録順を保持すること"""
+
+    dead_letter.add(CrawlRequest('https://books.toscrape.com/a', 'detail'), 'first', '')
+    dead_letter.add(CrawlRequest('https://books.toscrape.com/b', 'detail'), 'other', '')
+    dead_letter.add(
+        CrawlRequest('https://books.toscrape.com/a', 'catalogue', {'page_count': 1}), 'last', '')
+
+    requests = dead_letter.load()
+
+    assert [(r.url, r.page_type) for r in requests] == [
+        ('https://books.toscrape.com/a', 'catalogue'), ('https://books.toscrape.com/b', 'detail')]
+
+
+def test_load_and_clear_without_records(dead_letter):
+    """記録がない場合は空のリストを返し、削除もエラーにならないこと"""
+
+    assert dead_letter.load() == []
+    dead_letter.clear()
+    assert not dead_letter.exists()
@@ -0,0 +1,67 @@
+# 標準ライブラリ
+import os
+
+# 自己定義モジュール
+from frontier import VisitedSet
+
+
+def test_spill_moves_urls_to_sqlite():
+    """上限に達した時点でSQLiteに退避し、退避後も取得済みとして判定できること"""
+
+    visited = VisitedSet(memory_limit=3)
+    try:
+        for i in range(7):
+            visited.add(f'https://books.toscrape.com/{i}')
+
+        assert len(visited.memory) == 1
+        assert visited.spilled_count == 6
+        assert len(visited) == 7
+        assert all(f'https://books.toscrape.com/{i}' in visited for i in range(7))
+        assert 'https://books.toscrape.com/7' not in visited
+    finally:
+        visited.close()
+
+
+def test_spill_ignores_duplicates():
+    """退避済みのURLを再度退避しても件数が増えないこと"""
+
+    visited = VisitedSet(memory_limit=2)
+    try:
+        visited.add('https://books.toscrape.com/a')
+        visited.add('https://books.toscrape.com/b')
+        visited.add('https://books.toscrape.com/a')
+        visited.spill()
+
+        assert len(visited) == 2
+    finally:
+        visited.close()
+
+
+def test_temporary_db_is_removed_on_close():
+    """一時ファイルの退避先はclose()で削除されること"""
+
+    visited = VisitedSet(memory_limit=1)
+    visited.add('https://books.toscrape.com/a')
+    db_path = visited.db_path
+
+    assert os.path.exists(db_path)
+    visited.close()
+    assert not os.path.exists(db_path)
+
+
+def test_spilled_since_returns_urls_in_spill_order():
+    """前回の保存以降に退避されたURLのみを退避の順番で返すこと"""
+
+    visited = VisitedSet(memory_limit=100)
+    try:
+        assert visited.spilled_since(0) == []
+        visited.restore(['https://books.toscrape.com/a', 'https://books.toscrape.com/b'])
+        seq = visited.last_seq()
+        visited.add('https://books.toscrape.com/c')
+        visited.spill()
+
+        assert [url for _, url in visited.spilled_since(seq)] == ['https://books.toscrape.com/c']
+        assert 'https://books.toscrape.com/a' in visited
+        assert len(visited) == 3
+    finally:
+        visited.close()
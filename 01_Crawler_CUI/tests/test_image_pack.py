@@ -0,0 +1,96 @@
+# 標準ライブラリ
+import hashlib
+import os
+
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+from image_pack import ImagePackReader, ImagePackWriter, pack_paths
+from image_store import ImageStore
+
+
+def write_image(tmp_path, name, data):
+    """画像データの一時ファイルを作成し、(ハッシュ値, パス)を返す"""
+
+    path = tmp_path / name
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest(), str(path)
+
+
+def test_round_trip(tmp_path):
+    """追記した画像をハッシュ値から読み込み、拡張子付きで書き出せること"""
+
+    pack_path = str(tmp_path / 'images')
+    images = {
+        write_image(tmp_path, 'a', b'jpeg data'): '.jpg',
+        write_image(tmp_path, 'b', b'png data'): '.png',
+    }
+    writer = ImagePackWriter(pack_path)
+    for (digest, file_path), extension in images.items():
+        assert writer.append(digest, file_path, extension)
+    # 同じハッシュ値の画像は追記しない
+    digest, file_path = next(iter(images))
+    assert not writer.append(digest, file_path, '.jpg')
+    writer.close()
+
+    with ImagePackReader(pack_path) as reader:
+        assert len(reader) == 2
+        assert reader.get(digest) == b'jpeg data'
+        assert reader.get(hashlib.sha256(b'other').hexdigest()) is None
+        assert reader.extract(str(tmp_path / 'out')) == 2
+
+    assert sorted(os.listdir(tmp_path / 'out')) == sorted(
+        f'{digest}{extension}' for (digest, _), extension in images.items())
+
+
+def test_reopen_truncates_unindexed_tail(tmp_path):
+    """インデックスに記録されていない本体の末尾は再開時に切り詰めること"""
+
+    pack_path = str(tmp_path / 'images')
+    blob_path, _ = pack_paths(pack_path)
+    writer = ImagePackWriter(pack_path)
+    writer.append(*write_image(tmp_path, 'a', b'synced'), '.jpg')
+    writer.sync()
+    # sync()せずに中断した場合
+    writer.append(*write_image(tmp_path, 'b', b'lost'), '.jpg')
+    writer.blob.close()
+
+    writer = ImagePackWriter(pack_path)
+    assert len(writer) == 1
+    assert os.path.getsize(blob_path) == len(b'synced')
+    writer.append(*write_image(tmp_path, 'c', b'next'), '.png')
+    writer.close()
+
+    with ImagePackReader(pack_path) as reader:
+        assert reader.get(hashlib.sha256(b'next').hexdigest()) == b'next'
+
+
+@pytest.mark.parametrize('extension', ['.too-long-ext', '.画像'])
+def test_append_rejects_unrecordable_extension(tmp_path, extension):
+    """インデックスに記録できない拡張子は追記時にエラーとすること"""
+
+    writer = ImagePackWriter(str(tmp_path / 'images'))
+    with pytest.raises(ValueError):
+        writer.append(*write_image(tmp_path, 'a', b'data'), extension)
+    writer.close()
+
+
+@pytest.mark.parametrize('url, extension', [
+    ('https://books.toscrape.com/media/a.png', '.png'),
+    ('https://books.toscrape.com/media/a', '.jpg'),
+    ('https://books.toscrape.com/media/a.too-long-ext', '.jpg'),
+    ('https://books.toscrape.com/media/a.画像', '.jpg'),
+])
+def test_store_normalizes_extension(tmp_path, url, extension):
+    """パックに記録できない拡張子の画像はjpgとして保存すること"""
+
+    store = ImageStore(str(tmp_path / 'img'), pack=True)
+    store.prepare()
+    digest, temp_path = write_image(tmp_path, 'a', b'data')
+    store.put(url, temp_path, 4, digest)
+    store.flush()
+    store.close()
+
+    with ImagePackReader(store.pack_path) as reader:
+        assert [record[3] for record in reader.records()] == [extension]
@@ -0,0 +1,53 @@
+# 外部ライブラリ
+from lxml import etree
+import pytest
+
+# 自己定義モジュール
+from extractor import build_document
+from lxml_parser import xpath_literal
+
+
+HTML = '''<html><body>
+<p>plain text</p>
+<p>It's here</p>
+<p>say "hi"</p>
+<p>both "quoted" and it's</p>
+</body></html>'''
+
+
+@pytest.mark.parametrize('text', ['plain', "It's", 'say "hi"', '"quoted" and it\'s', '"\''])
+def test_xpath_literal_round_trips(text):
+    """XPathの文字列リテラルが元の文字列に評価されること(引用符を含む場合も)"""
+
+    assert etree.XPath(f'string({xpath_literal(text)})')(etree.Element('a')) == text
+
+
+@pytest.mark.parametrize('selector', [
+    'p:-soup-contains("plain")',
+    'p:-soup-contains("It\'s")',
+    'p:-soup-contains(\'say "hi"\')',
+    'p:-soup-contains(\'"quoted"\')',
+])
+def test_soup_contains_matches_bs4(selector):
+    """引用符を含む:-soup-containsの抽出結果がbs4と一致すること"""
+
+    texts = {
+        parser_backend: [tag.text for tag in build_document(HTML, parser_backend).select(selector)]
+        for parser_backend in ('bs4', 'lxml')}
+
+    assert texts['lxml'] == texts['bs4']
+    assert len(texts['lxml']) == 1
+
+
+@pytest.mark.parametrize('target', [None, ('p', {})])
+def test_xml_declaration_matches_bs4(target):
+    """encodingを含むXML宣言で始まるページ(XHTML等)も解析でき、抽出結果がbs4と一致すること"""
+
+    text = '<?xml version="1.0" encoding="utf-8"?>\n' + HTML
+    texts = {
+        parser_backend: [
+            tag.text for tag in build_document(text, parser_backend, target).select('p')]
+        for parser_backend in ('bs4', 'lxml')}
+
+    assert texts['lxml'] == texts['bs4']
+    assert len(texts['lxml']) == 4
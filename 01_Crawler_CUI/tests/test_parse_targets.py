@@ -0,0 +1,122 @@
+# 標準ライブラリ
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+from books_spider import BooksSpider
+from extractor import ExtractionPlan, build_document, extract, extract_shared, init_worker
+
+
+BACKENDS = ('bs4', 'lxml')
+PAGE_TYPES = ('start', 'catalogue', 'detail')
+
+
+def normalize(result, page_type):
+    """抽出結果を比較できる形式にする(一覧系のページはタグをURLとテキストの組にする)"""
+
+    if page_type != 'detail':
+        return {
+            selector: [(tag.attrs.get('href'), ' '.join(tag.text.split())) for tag in tags]
+            for selector, tags in result.items()}
+    return result
+
+
+def run_extract(text, parser_backend, page_type, partial=True):
+    """spiderの設定でページを解析/抽出し、比較できる形式で返す"""
+
+    spider = BooksSpider()
+    target = spider.parse_targets.get(page_type) if partial else None
+    soup = build_document(text, parser_backend, target)
+    plan = ExtractionPlan(spider.extraction_spec, parser_backend)
+    return normalize(extract(soup, page_type, plan, spider.link_selectors), page_type)
+
+
+@pytest.fixture(scope='module', params=BACKENDS)
+def parse_pool(request):
+    """crawlerと同じ初期化を行ったプロセスプール(パーサーごと)"""
+
+    spider = BooksSpider()
+    pool = ProcessPoolExecutor(
+        1, initializer=init_worker,
+        initargs=(
+            {spider.name: (spider.extraction_spec, spider.parse_targets, spider.link_selectors)},
+            request.param))
+    yield request.param, pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize('parser_backend', BACKENDS)
+@pytest.mark.parametrize('page_type', PAGE_TYPES)
+def test_partial_parse_matches_full_parse(read_page, parser_backend, page_type):
+    """部分解析の抽出結果が全体を解析した場合と一致し、欠損がないこと"""
+
+    text = read_page(page_type)
+    partial = run_extract(text, parser_backend, page_type)
+
+    assert partial == run_extract(text, parser_backend, page_type, partial=False)
+    if page_type == 'detail':
+        assert None not in partial.values()
+    else:
+        assert all(partial.values())
+
+
+def test_start_page_keeps_nav_with_multiple_classes(read_page):
+    """class="nav nav-list"の一覧ページのリンクを部分解析で抽出できること(bs4)"""
+
+    result = run_extract(read_page('start'), 'bs4', 'start')
+
+    assert [url for url, _ in result['ul.nav ul > li > a']] == [
+        'catalogue/category/books/travel_2/index.html',
+        'catalogue/category/books/mystery_3/index.html',
+        'catalogue/category/books/historical-fiction_4/index.html',
+    ]
+
+
+def test_header_lookup_is_not_shared_between_plans():
+    """表の見出しの部分一致の対応が抽出計画ごとに保持されること"""
+
+    spec = {
+        'scopes': {'table': {'selector': 'table', 'table': True}},
+        'fields': [{'name': 'price', 'scope': 'table', 'header': 'Price'}],
+    }
+    row = '<tr><th>{}</th><td>{}</td></tr>'
+    first, second = ExtractionPlan(spec), ExtractionPlan(spec)
+    first_page = f'<table>{row.format("Price (excl. tax)", "1")}</table>'
+    second_page = (
+        f'<table>{row.format("Price (incl. tax)", "2")}{row.format("Price (excl. tax)", "1")}</table>')
+
+    assert first.extract(build_document(first_page)) == {'price': '1'}
+    # 別の抽出計画では最初に部分一致する見出しを検索する
+    assert second.extract(build_document(second_page)) == {'price': '2'}
+
+
+@pytest.mark.parametrize('page_type', PAGE_TYPES)
+def test_backends_extract_same_values(read_page, page_type):
+    """bs4とlxmlの抽出結果が一致すること"""
+
+    text = read_page(page_type)
+
+    assert run_extract(text, 'lxml', page_type) == run_extract(text, 'bs4', page_type)
+
+
+@pytest.mark.parametrize('page_type', PAGE_TYPES)
+def test_parse_pool_matches_in_process(read_page, parse_pool, page_type):
+    """共有メモリ経由のプロセスプールの抽出結果が同じプロセスでの抽出と一致すること"""
+
+    parser_backend, pool = parse_pool
+    text = read_page(page_type)
+    content = text.encode('utf-8')
+    shm = SharedMemory(create=True, size=len(content))
+    try:
+        shm.buf[:len(content)] = content
+        result = pool.submit(
+            extract_shared, shm.name, len(content), 'utf-8', BooksSpider().name,
+            page_type).result()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert normalize(result, page_type) == run_extract(text, parser_backend, page_type)
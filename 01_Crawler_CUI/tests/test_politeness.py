@@ -0,0 +1,113 @@
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+import politeness
+from politeness import AutoThrottle, PolitenessScheduler, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic()を固定し、進める秒数を設定できる時計"""
+
+    now = [1000.0]
+    monkeypatch.setattr(politeness.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_burst_is_sent_without_delay(clock):
+    """burst分のリクエストは待機せずに送信できること"""
+
+    bucket = TokenBucket(2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+
+
+def test_consecutive_reservations_wait_in_order(clock):
+    """トークンが不足した連続の予約は送信間隔ずつ待機時間が加算されること"""
+
+    bucket = TokenBucket(2)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 2, 4]
+
+
+def test_tokens_refill_with_elapsed_time(clock):
+    """経過時間に応じてトークンが補充され、上限を超えないこと"""
+
+    bucket = TokenBucket(2, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock[0] += 3
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1)
+
+    clock[0] += 100
+    bucket.refill()
+    assert bucket.tokens == 2
+
+
+def test_zero_delay_never_waits(clock):
+    """送信間隔が0の場合は待機しないこと"""
+
+    bucket = TokenBucket(0)
+
+    assert [bucket.reserve() for _ in range(5)] == [0] * 5
+
+
+def test_randomized_cost_stays_within_range(clock):
+    """乱数化した場合の待機秒数が送信間隔の0.5倍～1.5倍であること"""
+
+    bucket = TokenBucket(2, randomize=True)
+
+    for _ in range(20):
+        bucket.tokens = 0
+        assert 1 <= bucket.reserve() <= 3
+
+
+def test_auto_throttle_moves_toward_latency():
+    """正常なレスポンスでは遅延秒数がレイテンシ/目標同時リクエスト数に近づくこと"""
+
+    throttle = AutoThrottle(0.5, 60)
+
+    assert throttle.adjust('books.toscrape.com', 3, 1, 200) == 2
+    assert throttle.adjust('books.toscrape.com', 2, 1, 200) == 1.5
+
+
+def test_auto_throttle_backs_off_on_errors():
+    """タイムアウト/サーバーエラーで遅延秒数が倍になり、上限を超えないこと"""
+
+    throttle = AutoThrottle(0.5, 5)
+
+    assert throttle.adjust('books.toscrape.com', 1, None, 408) == 2
+    assert throttle.adjust('books.toscrape.com', 2, None, 503) == 4
+    assert throttle.adjust('books.toscrape.com', 4, None, 500) == 5
+    # レイテンシはエラー応答では更新しない
+    assert 'books.toscrape.com' not in throttle.latency
+
+
+def test_auto_throttle_holds_delay_while_error_rate_is_high():
+    """エラー率が閾値を超えている間は遅延秒数を減らさないこと"""
+
+    throttle = AutoThrottle(0.5, 60)
+    throttle.adjust('books.toscrape.com', 1, None, 503)
+
+    assert throttle.adjust('books.toscrape.com', 2, 0.1, 200) == 2
+
+
+def test_auto_throttle_respects_min_delay():
+    """遅延秒数が下限を下回らないこと"""
+
+    throttle = AutoThrottle(0.5, 60)
+
+    assert throttle.adjust('books.toscrape.com', 0.5, 0.01, 200) == 0.5
+
+
+def test_scheduler_applies_auto_throttle_to_host_bucket(clock):
+    """観測結果が許可ドメインのバケットの送信間隔に反映されること"""
+
+    scheduler = PolitenessScheduler(
+        ['books.toscrape.com'], 1, auto_throttle=AutoThrottle(0.5, 60))
+    scheduler.record_response('https://books.toscrape.com/a', None, 408)
+
+    assert scheduler.buckets['books.toscrape.com'].delay_sec == 2
@@ -0,0 +1,81 @@
+# 標準ライブラリ
+import gzip
+
+# 外部ライブラリ
+import pytest
+import requests
+
+# 自己定義モジュール
+from books_spider import BooksSpider
+from crawler import Crawler
+
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html</loc></url>
+  <url><loc>https://books.toscrape.com/catalogue/category/books/poetry_23/index.html</loc></url>
+  <url><loc>https://books.toscrape.com/catalogue/tipping-the-velvet_999/index.html</loc></url>
+</urlset>
+"""
+
+SITEMAPINDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://books.toscrape.com/sitemap-1.xml.gz</loc></sitemap>
+  <sitemap><loc>https://books.toscrape.com/sitemap-2.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+
+class SitemapCrawler(object):
+    """サイトマップの解析に必要な処理のみを持つcrawler(frontierへの追加は記録のみ)"""
+
+    parse_document = Crawler.parse_document
+    read_xml = Crawler.read_xml
+    scrape_page_url = Crawler.scrape_page_url
+
+    def __init__(self):
+        self.parser_backend = 'bs4'
+        self.result_count = {'サイトマップ検出URL数': 0}
+        self.pushed = []
+
+    def push_request(self, url, page_type, meta=None, spider=None):
+        self.pushed.append((url, page_type))
+
+
+def parse_sitemap(content, url='https://books.toscrape.com/sitemap.xml'):
+    """サイトマップのレスポンスをspiderで処理し、crawlerを返す"""
+
+    crawler = SitemapCrawler()
+    spider = BooksSpider()
+    spider.crawler = crawler
+    r = requests.Response()
+    r.url = url
+    r._content = content
+    spider.parse_sitemap(None, r)
+    return crawler
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_urlset_pushes_detail_pages(compress):
+    """urlsetの詳細ページのURLのみを追加すること(gzipで圧縮されている場合は展開)"""
+
+    crawler = parse_sitemap(gzip.compress(URLSET) if compress else URLSET)
+
+    assert crawler.pushed == [
+        ('https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html', 'detail'),
+        ('https://books.toscrape.com/catalogue/tipping-the-velvet_999/index.html', 'detail'),
+    ]
+    assert crawler.result_count['サイトマップ検出URL数'] == 2
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_sitemapindex_pushes_child_sitemaps(compress):
+    """サイトマップインデックスの場合は子のサイトマップを追加すること"""
+
+    crawler = parse_sitemap(gzip.compress(SITEMAPINDEX) if compress else SITEMAPINDEX)
+
+    assert crawler.pushed == [
+        ('https://books.toscrape.com/sitemap-1.xml.gz', 'sitemap'),
+        ('https://books.toscrape.com/sitemap-2.xml', 'sitemap'),
+    ]
+    assert crawler.result_count['サイトマップ検出URL数'] == 0
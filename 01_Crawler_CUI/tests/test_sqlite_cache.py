@@ -0,0 +1,118 @@
+# 標準ライブラリ
+import os
+
+# 外部ライブラリ
+from cachecontrol.caches import FileCache
+import pytest
+
+# 自己定義モジュール
+import sqlite_cache
+from sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time()を固定し、進める秒数を設定できる時計(最終アクセス時刻の順序を確定させる)"""
+
+    now = [1000.0]
+    monkeypatch.setattr(sqlite_cache.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """一時ディレクトリに保存するキャッシュ"""
+
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'))
+    yield cache
+    cache.close()
+
+
+def test_set_and_get(cache):
+    """保存したデータを取得でき、存在しないキーはNoneになること"""
+
+    cache.set('https://books.toscrape.com/a', b'data')
+
+    assert cache.get('https://books.toscrape.com/a') == b'data'
+    assert cache.get('https://books.toscrape.com/b') is None
+
+
+def test_expired_entries_are_kept(cache):
+    """有効期限切れでも削除しないこと(再検証に使用するため)"""
+
+    cache.set('https://books.toscrape.com/a', b'data', expires=-1)
+
+    assert cache.get('https://books.toscrape.com/a') == b'data'
+
+
+def test_delete(cache):
+    """削除したデータは取得できず、合計サイズから差し引かれること"""
+
+    cache.set('https://books.toscrape.com/a', b'data')
+    cache.delete('https://books.toscrape.com/a')
+
+    assert cache.get('https://books.toscrape.com/a') is None
+    assert cache.total_size == 0
+
+
+def test_overwrite_does_not_double_count_size(cache):
+    """上書き時に合計サイズが二重に加算されないこと"""
+
+    cache.set('https://books.toscrape.com/a', b'data')
+    size = cache.total_size
+    cache.set('https://books.toscrape.com/a', b'data')
+
+    assert cache.total_size == size
+
+
+def test_lru_eviction_removes_least_recently_accessed(tmp_path, clock):
+    """最大サイズを超えた場合は最終アクセスが古いものから削除すること"""
+
+    value = os.urandom(1000)
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'), max_size=2500, compress_level=0)
+    try:
+        for key in ('a', 'b'):
+            cache.set(key, value)
+            clock[0] += 1
+        # aにアクセスしてbを最も古いものにする
+        cache.get('a')
+        clock[0] += 1
+        cache.set('c', value)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == value
+        assert cache.get('c') == value
+        assert cache.total_size <= cache.max_size
+    finally:
+        cache.close()
+
+
+def test_total_size_is_restored_on_reopen(tmp_path):
+    """再接続時に保存済みの合計サイズを読み込むこと"""
+
+    path = str(tmp_path / 'cache.sqlite')
+    cache = SQLiteCache(path)
+    cache.set('https://books.toscrape.com/a', b'data')
+    size = cache.total_size
+    cache.close()
+
+    reopened = SQLiteCache(path)
+    try:
+        assert reopened.total_size == size
+    finally:
+        reopened.close()
+
+
+def test_import_file_cache(cache, tmp_path):
+    """FileCacheのキャッシュを同じキーで取り込み、対象外のファイルは無視すること"""
+
+    cache_dir = str(tmp_path / 'file_cache')
+    file_cache = FileCache(cache_dir)
+    file_cache.set('https://books.toscrape.com/a', b'first')
+    file_cache.set('https://books.toscrape.com/b', b'second')
+    with open(os.path.join(cache_dir, 'notes.txt'), 'w') as f:
+        f.write('not a cache entry')
+
+    assert cache.import_file_cache(cache_dir) == 2
+    assert cache.get('https://books.toscrape.com/a') == b'first'
+    assert cache.get('https://books.toscrape.com/b') == b'second'
@@ -0,0 +1,63 @@
+# 外部ライブラリ
+import pytest
+
+# 自己定義モジュール
+from url_canonicalizer import UrlCanonicalizer, remove_dot_segments
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Books.ToScrape.com', 'https://books.toscrape.com/'),
+    ('https://books.toscrape.com:443/a', 'https://books.toscrape.com/a'),
+    ('http://books.toscrape.com:8080/a', 'http://books.toscrape.com:8080/a'),
+    ('https://books.toscrape.com/a/./b/../c', 'https://books.toscrape.com/a/c'),
+    ('https://books.toscrape.com/a#reviews', 'https://books.toscrape.com/a'),
+    ('https://books.toscrape.com/?utm_source=x&page=2&gclid=y',
+     'https://books.toscrape.com/?page=2'),
+    ('  https://books.toscrape.com/a  ', 'https://books.toscrape.com/a'),
+])
+def test_canonicalize(url, expected):
+    """同じページを指すURLが同じ文字列になること"""
+
+    assert UrlCanonicalizer().canonicalize(url) == expected
+
+
+def test_relative_url_is_resolved_against_base():
+    """相対URLがbaseを基準に解決されること"""
+
+    canonicalizer = UrlCanonicalizer()
+    base = 'https://books.toscrape.com/catalogue/category/books/travel_2/index.html'
+
+    assert canonicalizer.canonicalize('../../../a-light_1/index.html', base) == (
+        'https://books.toscrape.com/catalogue/a-light_1/index.html')
+
+
+@pytest.mark.parametrize('url', ['javascript:void(0)', 'mailto:a@b', 'https:///a', 'a/b'])
+def test_unsupported_url_raises_value_error(url):
+    """http/https以外やホストのないURLはValueErrorになること"""
+
+    with pytest.raises(ValueError):
+        UrlCanonicalizer().canonicalize(url)
+
+
+def test_results_are_cached():
+    """正規化の結果がLRUキャッシュで再利用されること"""
+
+    canonicalizer = UrlCanonicalizer(cache_size=1)
+    canonicalizer.canonicalize('https://books.toscrape.com/a')
+    canonicalizer.canonicalize('https://books.toscrape.com/a')
+    canonicalizer.canonicalize('https://books.toscrape.com/b')
+
+    info = canonicalizer.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 1)
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/a/b/../c', '/a/c'),
+    ('/../a', '/a'),
+    ('/a/b/..', '/a/'),
+    ('/a/.', '/a/'),
+])
+def test_remove_dot_segments(path, expected):
+    """パスの「.」「..」が解決され、ルートより上には遡らないこと"""
+
+    assert remove_dot_segments(path) == expected
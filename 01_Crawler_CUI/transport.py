@@ -0,0 +1,234 @@
+# 標準ライブラリ
+import io
+import weakref
+
+# 外部ライブラリ
+from cachecontrol.adapter import CacheControlAdapter
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from urllib3.response import HTTPResponse
+
+# HTTP/2はhttpxとh2(httpx[http2])がインストールされている場合のみ使用可能
+# (httpxのみの場合はhttpx.Client(http2=True)の生成時にImportErrorとなるため、h2も確認)
+try:
+    import h2  # noqa: F401
+    import httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class PooledCacheAdapter(CacheControlAdapter):
+    """
+    コネクションプールの設定を明示したキャッシュ用アダプター(HTTP/1.1)
+
+    Note:
+        urllib3のコネクションプールはホストごとにpool_maxsizeまでのコネクションを保持し、
+        keep-aliveにより次のリクエストで再利用する。
+        pool_maxsizeが同時リクエスト数より小さい場合、超えた分のコネクションは
+        使用後に破棄されるため、同時リクエスト数と同数を指定する。
+    """
+
+    def preconnect(self, url, headers=None, timeout=3.5):
+        """
+        URLのホストへの事前接続
+
+        Note:
+            HEADリクエスト(通常のリクエストと同じヘッダー)によりTCP/TLSのハンドシェイクを済ませ、
+            確立したコネクションはkeep-aliveによりプールに戻る(以降のリクエストで再利用)。
+            接続できなかった場合は例外を送出する。
+        """
+
+        self.poolmanager.request(
+            'HEAD', url, headers=headers, timeout=timeout, retries=False, redirect=False)
+
+    def connection_stats(self):
+        """ホストごとの接続数とリクエスト数を返す(差分がkeep-aliveによる再利用数)"""
+
+        stats = {}
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools[key]
+            stats[pool.host] = (pool.num_connections, pool.num_requests)
+        return stats
+
+
+class ResponseBody(io.BytesIO):
+    """
+    取得済みのレスポンス本文
+
+    Note:
+        CacheControlは本文のfpがNoneになった時点でキャッシュを書き込むため、
+        http.client.HTTPResponseと同様に読み終えた時点でfpをNoneにする。
+    """
+
+    fp = True
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        if self.tell() >= len(self.getbuffer()):
+            self.fp = None
+        return data
+
+
+class StreamBody(io.RawIOBase):
+    """
+    受信中のレスポンス本文(httpxのレスポンスを順に読み込む)
+
+    Note:
+        requestsのstream=Trueの場合(画像の分割受信等)に使用し、本文全体をメモリ上に保持しない。
+        ResponseBodyと同様に読み終えた時点でfpをNoneにし、httpxのレスポンスを閉じる。
+        受信中のhttpxの例外はrequestsの例外に変換する。
+    """
+
+    fp = True
+
+    def __init__(self, response, request):
+        # 受信中のhttpxのレスポンス
+        self.response = response
+        # 例外に付加するrequestsのリクエスト
+        self.request = request
+        # 展開前の本文の分割データ(展開はrequests側で行う)
+        self.chunks = response.iter_raw()
+        # 読み込み途中の分割データの残り
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        try:
+            while not self.buffer and self.fp:
+                try:
+                    self.buffer = next(self.chunks)
+                except StopIteration:
+                    self.close()
+        except httpx.TimeoutException as e:
+            self.close()
+            raise requests.exceptions.Timeout(e, request=self.request)
+        except httpx.TransportError as e:
+            self.close()
+            raise requests.exceptions.ConnectionError(e, request=self.request)
+
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+    def close(self):
+        self.fp = None
+        self.response.close()
+        super().close()
+
+
+class HTTP2Adapter(HTTPAdapter):
+    """
+    httpxによるHTTP/2のアダプター
+
+    Note:
+        HTTP/2は1つのコネクション上で複数のリクエストを多重化するため、
+        同時リクエスト時もホストごとのハンドシェイクは1回で済む。
+        レスポンスはurllib3のHTTPResponseに変換して返すため、
+        requests/CacheControlからはHTTP/1.1のアダプターと同様に扱える。
+        (サーバーがHTTP/2に対応していない場合はHTTP/1.1で通信)
+    """
+
+    def __init__(self, *args, pool_maxsize=DEFAULT_POOLSIZE, **kwargs):
+        super().__init__(*args, pool_maxsize=pool_maxsize, **kwargs)
+        # ホストごとのコネクションの上限
+        self.pool_maxsize = pool_maxsize
+        # ホストごとのリクエスト数
+        self.request_counts = {}
+        # ホストごとの使用中のコネクション(レスポンスのnetwork_streamを弱参照で保持)
+        self.connections = {}
+        # HTTP/2のクライアント(コネクションの上限はプールの設定値と同数)
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=self.pool_maxsize))
+
+    def send(
+            self, request, stream=False, timeout=None, verify=True,
+            cert=None, proxies=None):
+        """
+        リクエストの送信(requestsのタイムアウト/例外の形式に合わせる)
+
+        Note:
+            streamがTrueの場合は本文を受信しながら返し(StreamBody)、
+            それ以外の場合は本文を受信し終えてから返す(ResponseBody)。
+        """
+
+        # requestsのタイムアウト(接続, 読み込み)をhttpxの形式に変換
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+
+        try:
+            r = self.client.send(
+                self.client.build_request(
+                    request.method, request.url, headers=request.headers,
+                    content=request.body, timeout=timeout),
+                stream=True)
+            if stream:
+                body = StreamBody(r, request)
+            else:
+                try:
+                    # 展開前の本文(展開はrequests側で行う)
+                    body = ResponseBody(b''.join(r.iter_raw()))
+                finally:
+                    r.close()
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+        host = r.url.host
+        self.request_counts[host] = self.request_counts.get(host, 0) + 1
+        # リクエストに使用したコネクション(httpcoreの公開された拡張情報)
+        network_stream = r.extensions.get('network_stream')
+        if network_stream is not None:
+            self.connections.setdefault(host, weakref.WeakSet()).add(network_stream)
+
+        # urllib3のHTTPResponseに変換
+        resp = HTTPResponse(
+            body=body,
+            headers=r.headers.multi_items(),
+            status=r.status_code,
+            version=20 if r.http_version == 'HTTP/2' else 11,
+            reason=r.reason_phrase,
+            preload_content=False,
+            decode_content=False,
+            request_method=request.method,
+            request_url=request.url)
+        return self.build_response(request, resp)
+
+    def preconnect(self, url, headers=None, timeout=3.5):
+        """
+        URLのホストへの事前接続
+
+        Note:
+            HEADリクエスト(通常のリクエストと同じヘッダー)によりハンドシェイクを済ませ、
+            確立したコネクションは以降のリクエストで共有する(HTTP/2の場合は多重化)。
+        """
+
+        try:
+            self.client.head(url, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e)
+
+    def connection_stats(self):
+        """ホストごとの接続数(破棄されていないコネクション)とリクエスト数を返す"""
+
+        return {
+            host: (len(self.connections.get(host, ())), count)
+            for host, count in self.request_counts.items()}
+
+    def close(self):
+        self.client.close()
+        super().close()
+
+
+class HTTP2CacheAdapter(CacheControlAdapter, HTTP2Adapter):
+    """HTTP/2のキャッシュ用アダプター(CacheControlAdapterの送信処理をHTTP2Adapterで行う)"""
+
+    pass
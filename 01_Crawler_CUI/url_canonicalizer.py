@@ -0,0 +1,82 @@
+# 標準ライブラリ
+from functools import lru_cache
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+
+# スキームごとの既定ポート(正規化時に省略)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 削除するトラッキング用のクエリパラメーター
+TRACKING_PARAMS = re.compile(
+    r'^(?:utm_[a-z]+|gclid|fbclid|yclid|msclkid|mc_cid|mc_eid|_ga|_gl)$', re.IGNORECASE)
+
+
+def remove_dot_segments(path):
+    """パスの「.」「..」の解決(RFC 3986)"""
+
+    output = []
+    for segment in path.split('/'):
+        if segment == '..':
+            # ルートより上には遡らない
+            if len(output) > 1:
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    # 末尾が「.」「..」の場合はディレクトリとして扱う
+    if path.endswith(('/.', '/..')):
+        output.append('')
+    return '/'.join(output)
+
+
+class UrlCanonicalizer(object):
+    """
+    URLの正規化
+
+    Note:
+        以下の順に処理し、同じページを指すURLを同じ文字列にそろえる。
+            1. 基準URL(レスポンスのURL)による相対URLの解決
+            2. スキーム/ホストの小文字化、既定ポートの削除、パスの「.」「..」の解決
+            3. フラグメント/トラッキング用のクエリパラメーターの削除
+        http/https以外のURL(javascript:/mailto:等)はValueErrorを送出する。
+        正規化の結果は(URL, 基準URL)ごとにLRUキャッシュで保持する。
+    """
+
+    def __init__(self, cache_size=100000):
+        # 正規化(結果をキャッシュ)
+        self.canonicalize = lru_cache(maxsize=cache_size)(self.resolve)
+
+    def resolve(self, url, base=None):
+        """URLの正規化(baseを指定した場合は相対URLをbaseを基準に解決)"""
+
+        url = url.strip()
+        if base:
+            url = urljoin(base, url)
+
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            raise ValueError(f'正規化できないURLです: {url}')
+
+        host = parts.hostname.lower()
+        # 既定ポート以外の場合のみポートを残す
+        if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+            host = f'{host}:{parts.port}'
+        # パスが空の場合はルートとして扱う
+        path = parts.path or '/'
+        if '/.' in path:
+            path = remove_dot_segments(path)
+        # トラッキング用のパラメーターを削除(その他のパラメーターは順番/エンコードを維持)
+        query = '&'.join(
+            param for param in parts.query.split('&')
+            if param and not TRACKING_PARAMS.match(param.split('=', 1)[0]))
+        return urlunsplit((scheme, host, path, query, ''))
+
+    def cache_info(self):
+        """キャッシュのヒット数/ミス数等"""
+
+        return self.canonicalize.cache_info()
+
+
+# 共通で使用するインスタンス(frontier/crawler/Itemsでキャッシュを共有)
+default_canonicalizer = UrlCanonicalizer()
+canonicalize_url = default_canonicalizer.canonicalize
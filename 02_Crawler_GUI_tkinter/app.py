@@ -1,4 +1,5 @@
 # 標準ライブラリ
+import multiprocessing
 import queue
 import tkinter as tk
 from tkinter import messagebox, ttk
@@ -80,7 +81,9 @@ class ControlUi(object):
         # 「開始URL」の変数(入力欄表示用)
         target_url_var = tk.StringVar()
         # 空白文字列はEntry内部の左右余白を表現
-        target_url_var.set(' '+self.crawler.start_url+' ')
+        # (spiderが複数の場合は各spiderの開始URLを並べて表示)
+        target_url_var.set(
+            ' '+' / '.join(spider.start_url for spider in self.crawler.spiders)+' ')
 
         # 「開始URL」の入力欄(読み取り専用)
         target_url = tk.Entry(
@@ -220,10 +223,22 @@ class ControlUi(object):
         Note:
             ボタンを押すたびスレッド作成/スクレイピング処理を行うため、
             処理終了後も連続実行が可能
+            前回の途中経過がある場合は、再開するかどうかを確認
         """
 
+        # 途中経過から再開するかどうか
+        resume = False
+        # 前回の途中経過がある場合
+        if self.crawler.checkpoint.exists():
+            # tkinterのメッセージボックスにより再開確認/確認結果の代入
+            resume = messagebox.askyesno(
+                '確認',
+                '前回中断した処理の途中経過があります。\n'
+                '途中から再開しますか？(「いいえ」の場合は最初から処理します)'
+            )
+
         # スレッド作成/スクレイピング処理の呼び出し
-        self.crawler.start_crawler_thread()
+        self.crawler.start_crawler_thread(resume)
 
         # 処理開始に際してボタンの状態とメッセージの更新
         self.start_btn.config(state='disabled')
@@ -297,7 +312,8 @@ class ControlUi(object):
         ask_result = messagebox.askokcancel(
             '確認',
             'Crawlerの処理を取消しますか？\n'
-            '処理の途中で終了する場合、抽出データはファイル保存されません。'
+            '処理の途中で終了する場合、抽出データはファイル保存されません。\n'
+            '(途中経過は保存され、次回の開始時に再開できます)'
         )
 
         # 確認結果がTrueの場合(「OK」ボタン押下)
@@ -348,7 +364,8 @@ class ControlUi(object):
             ask_result = messagebox.askokcancel(
                 '確認',
                 'アプリを終了しますか？\n'
-                '処理の途中で終了する場合、抽出データはファイル保存されません。'
+                '処理の途中で終了する場合、抽出データはファイル保存されません。\n'
+                '(途中経過は保存され、次回の開始時に再開できます)'
             )
 
             # 確認結果がTrueの場合(「OK」ボタン押下)
@@ -556,4 +573,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # 実行ファイル(cx-Freeze)でHTMLの解析用のプロセスを起動できるようにする
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,103 @@
+# 標準ライブラリ
+import re
+
+# 自己定義モジュール
+from spider import Spider
+
+
+class BooksSpider(Spider):
+    """books.toscrape.comのspider(一覧ページから詳細ページの書籍情報/画像を取得)"""
+
+    def __init__(self):
+        super().__init__()
+
+        # spider名
+        self.name = 'books'
+        # スクレイピングの開始URL
+        self.start_url = 'https://books.toscrape.com/'
+        # 許可ドメインを定義
+        self.allowed_domains = [
+            'books.toscrape.com',
+        ]
+        # サイトマップに記載されたURLのうち詳細ページとして取得するURLのパターン
+        self.sitemap_detail_pattern = re.compile(
+            r'/catalogue/(?!category/)[^/]+/index\.html$')
+        # ページ種別ごとに解析するタグ(タグ名, 属性)、該当しないページ種別は全体を解析
+        # (抽出に必要な範囲のタグのみを解析してメモリ使用量/解析時間を削減)
+        # (SoupStrainerはclass属性を値全体で照合するため、class="nav nav-list"の
+        #  ようにクラスを複数持つタグはタグ名のみで指定する)
+        self.parse_targets = {
+            'start': ('ul', {}),
+            'catalogue': (['h3', 'li'], {}),
+            'detail': ('article', {}),
+        }
+        # 一覧系のページ種別ごとに抽出するタグのcssセレクター
+        self.link_selectors = {
+            'start': ['ul.nav ul > li > a'],
+            'catalogue': ['h3 > a', 'li.next > a'],
+        }
+        # 詳細ページのスクレイピング項目の定義(開始時に抽出計画としてコンパイル)
+        self.extraction_spec = {
+            'scopes': {
+                'contents': {'selector': 'article > div.row'},
+                'table': {'selector': 'table', 'table': True},
+            },
+            'fields': [
+                {'name': 'title', 'scope': 'contents', 'selector': 'h1'},
+                {'name': 'price', 'scope': 'table', 'header': 'excl'},
+                {'name': 'star', 'scope': 'contents',
+                 'selector': 'div.product_main p.star-rating', 'attr': 'class', 'index': 1,
+                 'process': 'convert_text_to_number'},
+                {'name': 'reviews', 'scope': 'table', 'header': 'reviews',
+                 'process': 'convert_integer'},
+                {'name': 'stock', 'scope': 'table', 'header': 'Availability',
+                 'process': 'extract_stock'},
+                {'name': 'upc', 'scope': 'table', 'header': 'UPC'},
+                {'name': 'image_url', 'scope': 'contents', 'selector': 'div.item > img',
+                 'attr': 'src', 'process': 'convert_image_url'},
+            ],
+        }
+        # 画像URLの項目名
+        self.image_field = 'image_url'
+
+    def parse_start(self, request, r):
+        """開始ページの処理(一覧ページのURLを追加)"""
+
+        # cssセレクター(各一覧ページのページURL)
+        selector = 'ul.nav ul > li > a'
+        # 一覧ページのurlを取得
+        catalogue_urls = self.crawler.scrape_page_url(r, selector)
+
+        # 一覧ページの制限
+        for url in catalogue_urls[:2]:
+            # 一覧ページの1ページ目としてfrontierに追加
+            self.push_request(url, 'catalogue', {'page_count': 1})
+
+    def parse_catalogue(self, request, r):
+        """一覧ページの処理(詳細ページと次ページのURLを追加)"""
+
+        # cssセレクター(各詳細ページのページURL)
+        selector = 'h3 > a'
+        # 詳細ページのurlを取得
+        detail_urls = self.crawler.scrape_page_url(r, selector)
+
+        # 詳細ページのurlを順にfrontierに追加
+        for url in detail_urls:
+            self.push_request(url, 'detail')
+
+        # 詳細ページの抽出終了につきカウント
+        page_count = request.meta['page_count'] + 1
+        # 詳細ページの制限
+        if page_count > 2:
+            return
+
+        # cssセレクター(次ページのURL)
+        selector = 'li.next > a'
+        # 次ページurlの取得
+        next_page_url = self.crawler.scrape_page_url(r, selector, is_next=True)
+        # 次ページurlがある場合
+        if next_page_url:
+            # 次ページを一覧ページとしてfrontierに追加
+            self.push_request(
+                next_page_url[0], 'catalogue', {'page_count': page_count})
+            self.crawler.log_handler.logger.info('>> 次のページに遷移')
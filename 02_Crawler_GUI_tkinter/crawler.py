@@ -1,29 +1,64 @@
 # 標準ライブラリ
-from collections import defaultdict
+import asyncio
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import gzip
+from multiprocessing.shared_memory import SharedMemory
 import os
-import random
-import re
 import threading
 import time
 import traceback
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+import zlib
 
 # 外部ライブラリ
 from bs4 import BeautifulSoup
-from cachecontrol import CacheControl
 from cachecontrol.caches import FileCache
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, RetryError
 
 # 自己定義のモジュール
+from books_spider import BooksSpider
+from checkpoint import Checkpoint
+from dead_letter import DeadLetter
+from extractor import build_document, extract_shared, init_worker
+from fetch_engine import FetchEngine
+from frontier import CrawlRequest, Frontier, VisitedSet
+from image_pack import ImagePackReader, pack_paths
+from image_queue import ImageQueue
+from image_store import ImageStore
 from log_handler import Logger
 from items import Items
+from politeness import AutoThrottle, PolitenessScheduler
+from recrawl_store import RecrawlStore
+from sqlite_cache import SQLiteCache
+from transport import HTTP2_AVAILABLE, HTTP2CacheAdapter, PooledCacheAdapter
+from url_canonicalizer import canonicalize_url, default_canonicalizer
 from user_agent import UserAgent
 
 
 # キャッシュを保存する場合のディレクトリパス
 CACHE_DIR = './.webcache'
+# キャッシュを単一ファイル(sqlite)で保存する場合のファイルパス
+CACHE_DB_PATH = './.webcache.sqlite'
+# 途中経過を保存する場合のファイルパス
+CHECKPOINT_PATH = './.checkpoint.sqlite'
+# 差分crawlのバリデーター/スクレイピングデータを保存する場合のファイルパス
+RECRAWL_PATH = './.recrawl.sqlite'
+# 処理に失敗したリクエストを記録するファイルパス
+DEAD_LETTER_PATH = './dead_letter.jsonl'
+
+
+class TemporaryError(Exception):
+    """一時的なエラー(frontierに再追加して再試行)"""
+
+    pass
+
+
+class PageError(Exception):
+    """URL単位のエラー(許容モードの場合はdead letterに記録して処理を継続)"""
+
+    pass
 
 
 class Config(object):
@@ -33,12 +68,10 @@ class Config(object):
         # log_handlerモジュールをインスタンス化
         self.log_handler = Logger(name=__name__, stdout=False)
 
-        # スクレイピングの開始URL
-        self.start_url = 'https://books.toscrape.com/'
-
-        # 許可ドメインを定義
-        self.allowed_domains = [
-            'books.toscrape.com',
+        # crawlするサイトのspider(サイト固有の設定/処理はspiderごとに定義)
+        # (複数登録した場合は送信間隔/キャッシュ/同時リクエスト数を共有して並行してcrawl)
+        self.spiders = [
+            BooksSpider(),
         ]
         # ユーザーエージェントのブラウザ名
         browser = 'chrome'
@@ -46,6 +79,37 @@ class Config(object):
         self.delay_sec = 2
         # 遅延秒数の乱数化
         self.randomize = True
+        # 遅延なしで連続送信できるリクエスト数(ホストごと)
+        self.burst = 1
+        # レイテンシ/エラー率に応じた遅延秒数の自動調整
+        self.auto_throttle = False
+        # 自動調整する遅延秒数の下限
+        self.min_delay_sec = 0.5
+        # 自動調整する遅延秒数の上限
+        self.max_delay_sec = 10
+        # 許容モード(URL単位のエラーはdead letterに記録して処理を継続)
+        self.tolerant = False
+        # 一時的なエラーによる再試行の上限数
+        self.max_retries = 4
+        # 再試行までの待機秒数の基準値(再試行のたびに倍に増加)
+        self.retry_backoff = 1
+        # 同時リクエスト数(並行処理の上限)
+        self.concurrency = 4
+        # 取得済みURLをメモリ上で保持する上限(超えた分はディスクに退避)
+        self.visited_memory_limit = 100000
+        # サイトマップによるURL検出(robots.txtにサイトマップの記載がある場合は一覧ページを取得しない)
+        # (spiderに詳細ページのURLのパターンがある場合のみ)
+        self.sitemap = False
+        # 途中経過を保存する間隔(秒)
+        self.checkpoint_interval = 60
+        # 差分crawl(変更のない詳細ページは前回のスクレイピングデータを再利用)
+        self.incremental = False
+        # オフライン(ネットワークを使用せず、すべてのリクエストをキャッシュから取得)
+        self.offline = False
+        # HTMLの解析方法('bs4': BeautifulSoup(cssセレクター)/'lxml': lxml.html(コンパイル済みのXPath))
+        self.parser_backend = 'bs4'
+        # HTMLの解析/抽出を行うプロセス数(0の場合はcrawlerのスレッドで解析)
+        self.parse_workers = 0
         # 取得レスポンスのエンコード
         self.encoding = 'utf-8'
         # 出力先のディレクトリ
@@ -55,8 +119,28 @@ class Config(object):
         self.output_extension = 'csv'
         # 画像データの出力フラグ
         self.img_out = True
-        # 画像データのファイル名
-        self.img_title = None
+        # 画像の保存先(ハッシュ値で保存し、実行をまたいで共有)
+        self.img_store_dir = f'{self.output_dir}/image_store'
+        # 画像を画像ごとのファイルではなく単一ファイル(本体+インデックス)に保存
+        self.img_pack = False
+        # 画像の保存(確定処理)を行うスレッド数
+        self.img_write_workers = 2
+        # 画像1件あたりの最大サイズ(バイト数、超えた場合は保存しない)
+        self.img_max_size = 10 * 1024 ** 2
+        # 画像の同時リクエスト数(ページのリクエストとは別枠)
+        self.img_concurrency = 2
+        # 画像のリクエストに対する遅延秒数(ページのリクエストとは別に管理)
+        self.img_delay_sec = 1
+        # 画像の遅延なしで連続送信できるリクエスト数(ホストごと)
+        self.img_burst = 1
+        # キャッシュの保存形式('file': URLごとのファイル/'sqlite': 単一ファイル)
+        self.cache_backend = 'file'
+        # キャッシュの最大サイズ(バイト数、sqliteの場合のみ古いものから削除)
+        self.cache_max_size = 1024 ** 3
+        # 開始前に許可ドメインへ事前接続(TCP/TLSのハンドシェイク)
+        self.preconnect = True
+        # HTTP/2の使用(requirements-http2.txtのhttpx[http2]のインストールが必要)
+        self.http2 = False
 
         # リクエストを送る際のユーザーエージェントを定義
         ua = UserAgent()
@@ -65,8 +149,25 @@ class Config(object):
         self.headers = {'User-Agent': self.user_agent}
         # リクエスト情報の保持やパフォーマンス向上のためセッションを定義
         session = requests.Session()
-        # セッションを基にキャッシュを定義
-        self.session_cache = CacheControl(session, FileCache(CACHE_DIR))
+        # キャッシュの保存先を定義
+        if self.cache_backend == 'sqlite':
+            self.http_cache = SQLiteCache(CACHE_DB_PATH, self.cache_max_size)
+        else:
+            self.http_cache = FileCache(CACHE_DIR)
+        # HTTP/2を使用できない場合はHTTP/1.1で通信
+        if self.http2 and not HTTP2_AVAILABLE:
+            self.log_handler.logger.warning(
+                'httpx[http2]がインストールされていないため、HTTP/1.1で通信します。')
+            self.http2 = False
+        adapter_class = HTTP2CacheAdapter if self.http2 else PooledCacheAdapter
+        # キャッシュ/コネクションプールを設定したアダプターを定義
+        # (ホストごとに保持するコネクション数はページと画像の同時リクエスト数の合計と同数)
+        self.http_adapter = adapter_class(
+            self.http_cache, pool_maxsize=self.concurrency + self.img_concurrency)
+        session.mount('http://', self.http_adapter)
+        session.mount('https://', self.http_adapter)
+        # キャッシュ/コネクションプールを設定したセッション
+        self.session_cache = session
 
 
 class Crawler(Config):
@@ -100,6 +201,14 @@ class Crawler(Config):
     def __init__(self):
         super().__init__()
 
+        # spiderの登録(抽出計画のコンパイル/Itemsモジュールのインスタンス化)
+        self.spider_index = {}
+        for spider in self.spiders:
+            spider.open(self)
+            self.spider_index[spider.name] = spider
+        # 全spiderの許可ドメイン(送信間隔はホストごとに全spiderで共有)
+        self.allowed_domains = [
+            domain for spider in self.spiders for domain in spider.allowed_domains]
         # 出力パスの生成
         self.create_output_path()
 
@@ -110,27 +219,66 @@ class Crawler(Config):
         # ステータスを「初期値」に設定
         self.crawler_status = self.status[0]
 
-    def create_output_path(self):
-        """出力パスの生成"""
+        # fetch_engineモジュールのインスタンス化(リクエストの並行処理)
+        # (画像はバックグラウンドで別枠の同時リクエスト数により処理)
+        self.fetch_engine = FetchEngine(self.concurrency, self.img_concurrency)
+        # 遅延秒数を自動調整する場合
+        auto_throttle = None
+        if self.auto_throttle:
+            auto_throttle = AutoThrottle(self.min_delay_sec, self.max_delay_sec)
+        # politenessモジュールのインスタンス化(ホスト単位の送信間隔の管理)
+        self.scheduler = PolitenessScheduler(
+            self.allowed_domains, self.delay_sec, self.burst, self.randomize,
+            auto_throttle)
+        # 画像用のpolitenessモジュールのインスタンス化(ページとは別の送信間隔)
+        self.img_scheduler = PolitenessScheduler(
+            self.allowed_domains, self.img_delay_sec, self.img_burst, self.randomize)
+        # checkpointモジュールのインスタンス化(途中経過の保存/復元)
+        self.checkpoint = Checkpoint(CHECKPOINT_PATH)
+        # recrawl_storeモジュールのインスタンス化(差分crawlの場合のみ)
+        self.recrawl_store = RecrawlStore(RECRAWL_PATH) if self.incremental else None
+        # image_storeモジュールのインスタンス化(画像のハッシュ値による保存)
+        self.image_store = ImageStore(
+            self.img_store_dir, self.img_write_workers, self.img_pack)
+        # dead_letterモジュールのインスタンス化(処理に失敗したリクエストの記録)
+        self.dead_letter = DeadLetter(DEAD_LETTER_PATH)
+
+    def create_output_path(self, date_time=None):
+        """出力パスの生成(途中から再開する場合は中断時の実行日時を使用)"""
 
         # 実行日時を定義
-        self.date_time = datetime.strftime(datetime.now(), '%Y%m%d%H%M%S')
+        self.date_time = date_time or datetime.strftime(
+            datetime.now(), '%Y%m%d%H%M%S')
 
         # ファイル名を定義
         file_name = f'{self.date_time}_scrape.{self.output_extension}'
         # 出力パスを定義
         self.output_file_path = os.path.join(
             self.output_dir, file_name).replace(os.sep, '/')
-
-    def start_crawler_thread(self):
-        """crawlerのスレッド作成/処理開始"""
+        # spiderごとの(スクレイピングデータ, 画像の対応表)の出力パス
+        # (spiderが複数の場合はファイル名にspider名を付加)
+        self.spider_output_paths = {}
+        for spider in self.spiders:
+            prefix = self.date_time
+            if len(self.spiders) > 1:
+                prefix = f'{self.date_time}_{spider.name}'
+            self.spider_output_paths[spider.name] = (
+                os.path.join(
+                    self.output_dir, f'{prefix}_scrape.{self.output_extension}'
+                ).replace(os.sep, '/'),
+                f'{self.output_dir}/{prefix}_images.csv')
+
+    def start_crawler_thread(self, resume=False):
+        """crawlerのスレッド作成/処理開始(resumeがTrueの場合は途中経過から再開)"""
 
         # 実行時のタイムスタンプ(経過時間算出のため)
         self.execute_time = time.time()
         # スレッドの定義(スレッド上で行う処理はdef run_crawler)
-        self.crawler_thread = threading.Thread(target=self.run_crawler)
-        # itemsモジュールのインスタンス化
-        self.items = Items(self.log_handler)
+        self.crawler_thread = threading.Thread(
+            target=self.run_crawler, args=(resume,))
+        # spiderごとにitemsモジュールのインスタンス化
+        for spider in self.spiders:
+            spider.items = Items(self.log_handler, spider.extraction_plan)
 
         # ログ表示する処理結果のカウント
         self.result_count = {
@@ -138,12 +286,25 @@ class Crawler(Config):
             'レスポンス受信数': 0,
             'ステータスコード': defaultdict(int),
             'スクレイピング処理数': 0,
+            '重複URL数': 0,
+            '再利用データ数': 0,
+            'キャッシュ未取得数': 0,
+            'リトライ数': 0,
+            'リトライ待機秒数': 0,
+            'エラーURL数': 0,
+            '画像サイズ超過数': 0,
+            'サイトマップ検出URL数': 0,
+            'ページ解析秒数': 0,
         }
+        # 処理結果のカウントのロック(画像のバックグラウンド取得によりevent loopのスレッドからも更新)
+        self.count_lock = threading.Lock()
+        # オフライン時にキャッシュから取得できなかったURL
+        self.offline_gaps = []
 
         # スレッドの開始(処理開始)
         self.crawler_thread.start()
 
-    def run_crawler(self):
+    def run_crawler(self, resume=False, retry_dead_letter=False):
         """crawlerの全体処理を管理"""
 
         self.log_handler.logger.info('----- 処理開始 -----')
@@ -157,51 +318,491 @@ class Crawler(Config):
 
         # crawlerの設定状況等をログ表示
         self.display_crawler_info()
-        # 開始URLのcrawl(リクエスト)
-        r = self.crawl(self.start_url)
-        # 上記のレスポンスを基にスクレイピング処理
-        self.execute_scraping(r)
+        # 許可ドメインへの事前接続(オフラインの場合は不要)
+        if self.preconnect and not self.offline:
+            self.preconnect_hosts()
+        # dead letterのリクエストのみを再実行する場合
+        if retry_dead_letter:
+            self.setup_frontier()
+            self.push_dead_letters()
+        # frontierの生成(再開しない場合は開始URLを追加)
+        elif not self.setup_frontier(resume):
+            # 最初から処理する場合は前回のdead letterを削除
+            if self.dead_letter.exists():
+                self.log_handler.logger.warning('前回のdead letterを削除します。')
+                self.dead_letter.clear()
+            self.push_start_requests()
+
+        # 画像出力の必要がある場合は取得した画像の保存先を作成
+        if self.img_out:
+            self.image_store.prepare()
+        # HTMLの解析/抽出を行うプロセスプールの生成
+        # (ワーカーごとにspiderの抽出計画をコンパイルするため、spiderごとの定義/解析の設定を渡す)
+        self.parse_pool = ProcessPoolExecutor(
+            self.parse_workers, initializer=init_worker,
+            initargs=(
+                {spider.name: (
+                    spider.extraction_spec, spider.parse_targets, spider.link_selectors)
+                 for spider in self.spiders},
+                self.parser_backend),
+        ) if self.parse_workers else None
+
+        try:
+            # frontierを基にcrawl/スクレイピング処理
+            self.execute_scraping()
+        # 取消/エラーにより処理が中断された場合
+        except Exception:
+            # 次回再開できるよう途中経過を保存
+            self.save_checkpoint()
+            # 取得中の画像のタスクを取消
+            self.image_queue.cancel()
+            self.image_store.close()
+            self.stop_parse_pool()
+            self.frontier.visited.close()
+            self.checkpoint.close()
+            raise
+
+        # 画像のパックの書き込み/プロセスプールを終了
+        self.image_store.close()
+        self.stop_parse_pool()
 
         # ステータスが「取消終了/エラー終了」以外の場合
         if not self.crawler_status == self.status[3]:
-            # 画像出力フラグがTrueの場合
-            if self.img_out:
-                # Itemsモジュールの画像出力
-                self.items.output_img(self.output_dir, self.date_time)
+            # spiderごとのファイル出力
+            for spider in self.spiders:
+                file_path, manifest_path = self.spider_output_paths[spider.name]
+                # 画像出力フラグがTrueの場合
+                if self.img_out and spider.image_field:
+                    # Itemsモジュールの画像出力
+                    spider.items.output_img(manifest_path, spider.image_field)
 
-            # 画像以外のデータをファイル出力
-            self.items.output_file(self.output_file_path)
+                # 画像以外のデータをファイル出力
+                spider.items.output_file(file_path)
+
+            # オフライン時にキャッシュから取得できなかったURLがある場合
+            if self.offline_gaps:
+                self.output_offline_gaps()
 
             # ステータスを「初期値」に設定
             self.crawler_status = self.status[0]
 
-        # Itemsモジュールのデータ格納場所を初期化
-        self.items.items = []
-        self.items.img_data = {}
+        # spiderごとにItemsモジュールのデータ格納場所を初期化
+        for spider in self.spiders:
+            spider.items.items = []
+            spider.items.img_data = {}
+        # 正常終了につき途中経過を削除
+        self.frontier.visited.close()
+        self.checkpoint.clear()
 
         # log_handlerモジュールの初期化
         self.log_handler.logger.removeHandler(self.log_handler.file_handler)
         self.log_handler.queue_handler.log_box = []
 
+    def setup_frontier(self, resume=False):
+        """
+        frontierの生成(再開する場合は途中経過を復元)
+
+        Note:
+            取得済みURLは途中経過の保存時に処理待ちのリクエストと同時に保存され、
+            再開時にVisitedSetの退避先に復元する。
+            途中経過を復元できた場合はTrueを返す。
+        """
+
+        # 再開しない場合は前回の途中経過を削除
+        if not resume:
+            if self.checkpoint.exists():
+                self.log_handler.logger.warning('前回の途中経過を削除して最初から処理します。')
+            self.checkpoint.clear()
+
+        # 途中経過の保存先に接続
+        self.checkpoint.open()
+        # frontierモジュールのインスタンス化(crawl予定のURLと取得済みURLの管理)
+        self.frontier = Frontier(
+            VisitedSet(self.visited_memory_limit))
+        # 処理中のリクエスト(途中経過の保存時は処理待ちとして扱う)
+        self.in_progress = deque()
+        # image_queueモジュールのインスタンス化(画像のバックグラウンド取得)
+        self.image_queue = ImageQueue(self.fetch_engine)
+        # 途中経過を保存した時刻
+        self.last_checkpoint_time = time.time()
+
+        # 再開しない場合
+        if not resume:
+            return False
+
+        # 途中経過の読み込み
+        state = self.checkpoint.load()
+        # 途中経過が保存されていない場合は最初から処理
+        if not state:
+            self.log_handler.logger.warning('途中経過がないため最初から処理します。')
+            return False
+
+        # 中断時の実行日時で出力パスを生成
+        self.create_output_path(state['date_time'])
+        # 処理結果のカウントと抽出済みのデータを復元
+        self.result_count = state['result_count']
+        for spider in self.spiders:
+            spider.items.items = state['items'].get(spider.name, [])
+            spider.items.img_data = state['img_data'].get(spider.name, {})
+        # 処理待ちのリクエストと取得済みURLを復元
+        self.frontier.restore(state['requests'])
+        self.checkpoint.load_visited(self.frontier.visited)
+
+        self.log_handler.logger.info('----- 途中から再開 -----')
+        self.log_handler.logger.info(
+            f'- 処理待ちURL数: {len(self.frontier)}')
+        self.log_handler.logger.info(
+            f'- 取得済みURL数: {len(self.frontier.visited)}')
+        self.log_handler.logger.info(
+            f'- 抽出済みデータ数: {self.count_items()}')
+        return True
+
+    def stop_parse_pool(self):
+        """HTMLの解析/抽出を行うプロセスプールの終了"""
+
+        if self.parse_pool:
+            self.parse_pool.shutdown(cancel_futures=True)
+            self.parse_pool = None
+
+    def push_start_requests(self):
+        """
+        spiderごとの開始リクエストの追加
+
+        Note:
+            サイトマップを使用できる場合は一覧ページの代わりにサイトマップを追加。
+        """
+
+        for spider in self.spiders:
+            # サイトマップによるURL検出を行う場合
+            if self.sitemap and spider.sitemap_detail_pattern:
+                sitemap_urls = self.discover_sitemaps(spider.start_url)
+                # robots.txtにサイトマップの記載がある場合はサイトマップのみを追加
+                if sitemap_urls:
+                    for url in sitemap_urls:
+                        spider.push_request(url, 'sitemap')
+                    continue
+                self.log_handler.logger.warning(
+                    f'robots.txtからサイトマップを取得できないため、一覧ページから取得します。'
+                    f'({spider.name})')
+            for url, page_type, meta in spider.start_requests():
+                spider.push_request(url, page_type, meta)
+
+    def discover_sitemaps(self, start_url):
+        """robots.txtに記載されたサイトマップのURLを返す(取得できない場合は空のリスト)"""
+
+        robots_url = urljoin(start_url, '/robots.txt')
+        # robots.txtは存在しない場合もあるため、エラー終了せずに一覧ページからの取得に切り替える
+        r = self.fetch_engine.run(self.crawl_async(robots_url, required=False))
+        if isinstance(r, (TemporaryError, PageError)):
+            self.log_handler.logger.warning(f'robots.txtの取得に失敗しました。{r}')
+            return []
+        if r is None:
+            return []
+
+        # 「Sitemap: URL」の行を抽出(項目名は大文字/小文字を区別しない)
+        sitemap_urls = []
+        for line in r.text.splitlines():
+            name, _, value = line.partition(':')
+            if name.strip().lower() != 'sitemap' or not value.strip():
+                continue
+            # robots.txtのURLを基準に正規化
+            try:
+                sitemap_urls.append(canonicalize_url(value.strip(), robots_url))
+            # 想定していないURL(http/https以外等)が記載されている場合
+            except ValueError:
+                # エラーメッセージの定義
+                error_msg = (
+                    '[Sitemap] robots.txtに予期せぬサイトマップのURLが記載されているため処理を中止します。'
+                    f'URL: {value.strip()}'
+                )
+                # エラー終了(許容モードの場合は該当のURLのみスキップ)
+                try:
+                    self.page_error(error_msg)
+                except PageError:
+                    continue
+        self.log_handler.logger.info(f'> サイトマップ: {len(sitemap_urls)}件({robots_url})')
+        return sitemap_urls
+
+    def push_dead_letters(self):
+        """
+        dead letterに記録したリクエストをfrontierに追加
+
+        Note:
+            再実行中のエラーで処理が中断されないよう許容モードで処理し、
+            再度失敗したリクエストは改めてdead letterに記録する。
+        """
+
+        self.tolerant = True
+        requests = self.dead_letter.load()
+        self.dead_letter.clear()
+        for request in requests:
+            self.push_request(request.url, request.page_type, request.meta, request.spider)
+        self.log_handler.logger.info(f'> dead letterの再実行: {len(requests)}件')
+
+    def save_checkpoint(self):
+        """途中経過の保存(処理中のリクエストは処理待ちとして保存)"""
+
+        # 保存する画像のメタデータが指す画像の確定を待機
+        self.image_store.flush()
+
+        # 処理中と処理待ち(再試行待ちを含む)のリクエストと取得中の画像
+        requests = (
+            list(self.in_progress) + self.frontier.requests()
+            + self.image_queue.requests())
+        self.checkpoint.save(
+            self.date_time, self.copy_result_count(), requests, self.frontier.visited,
+            {spider.name: (spider.items.items, spider.items.img_data)
+             for spider in self.spiders})
+        # 保存した時刻を更新
+        self.last_checkpoint_time = time.time()
+        self.log_handler.logger.info(
+            f'途中経過を保存(処理待ちURL数: {len(requests)}/'
+            f'抽出済みデータ数: {self.count_items()})')
+
+    def extract_image_pack(self, output_dir):
+        """画像のパックを画像ごとのファイルとしてディレクトリに書き出し"""
+
+        # パックに保存していない場合(未実行/画像ごとのファイルに保存)は書き出さない
+        _, index_path = pack_paths(self.image_store.pack_path)
+        if not os.path.exists(index_path):
+            self.log_handler.logger.error(
+                f'画像のパックが存在しないため書き出しできません。{index_path}')
+            return
+
+        with ImagePackReader(self.image_store.pack_path) as reader:
+            count = reader.extract(output_dir)
+        self.log_handler.logger.info(
+            f'> 画像の書き出し: {self.image_store.pack_path} -> {output_dir}[{count}件]')
+
+    def output_offline_gaps(self):
+        """オフライン時にキャッシュから取得できなかったURLのファイル出力"""
+
+        file_path = os.path.join(
+            self.output_dir, f'{self.date_time}_offline_gaps.txt').replace(os.sep, '/')
+        with open(file_path, 'w', encoding=self.encoding) as f:
+            f.write('\n'.join(self.offline_gaps) + '\n')
+        self.log_handler.logger.warning(
+            f'> キャッシュ未取得URLの出力: {file_path}[{len(self.offline_gaps)}件]')
+
+    def preconnect_hosts(self):
+        """許可ドメインへの並行した事前接続(接続できない場合も処理は継続)"""
+
+        # spiderごとに開始URLと同じスキームで接続
+        urls = [
+            f'{urlsplit(spider.start_url).scheme}://{domain}/'
+            for spider in self.spiders for domain in spider.allowed_domains]
+        results = self.fetch_engine.gather(
+            [self.preconnect_async(url) for url in urls])
+        self.log_handler.logger.info(
+            f'> 事前接続: {sum(results)}/{len(urls)}件')
+
+    async def preconnect_async(self, url):
+        """
+        事前接続の実行(スレッドプールで実行し、接続できた場合はTrueを返す)
+
+        Note:
+            事前接続もリクエストのため、通常のリクエストと同じヘッダー/遅延処理で送信する。
+        """
+
+        await self.request_delay(url)
+        try:
+            await self.fetch_engine.run_blocking(
+                self.http_adapter.preconnect, url, self.headers)
+        except Exception as e:
+            self.log_handler.logger.warning(f'[Preconnect] 事前接続に失敗しました。{url}: {e}')
+            return False
+        return True
+
     def display_crawler_info(self):
         """crawlerの設定情報を表示"""
 
-        self.log_handler.logger.info(
-            f'- 開始URL: {self.start_url}')
+        for spider in self.spiders:
+            self.log_handler.logger.info(
+                f'- 開始URL: {spider.start_url}(spider: {spider.name})')
         self.log_handler.logger.info(
             f'- ユーザーエージェント: {self.headers["User-Agent"]}')
         self.log_handler.logger.info(
             f'- リクエスト遅延秒数: {self.delay_sec}')
         self.log_handler.logger.info(
             f'- 遅延秒数のランダム化: {self.randomize}')
+        self.log_handler.logger.info(
+            f'- 連続送信数: {self.burst}')
+        self.log_handler.logger.info(
+            f'- 遅延秒数の自動調整: {self.auto_throttle}'
+            f'({self.min_delay_sec}s～{self.max_delay_sec}s)')
+        self.log_handler.logger.info(
+            f'- 差分crawl: {self.incremental}')
+        self.log_handler.logger.info(
+            f'- 許容モード: {self.tolerant}')
+        self.log_handler.logger.info(
+            f'- オフライン: {self.offline}')
+        self.log_handler.logger.info(
+            f'- キャッシュの保存形式: {self.cache_backend}')
+        self.log_handler.logger.info(
+            f'- 同時リクエスト数: {self.concurrency}')
+        self.log_handler.logger.info(
+            f'- 画像の同時リクエスト数: {self.img_concurrency}'
+            f'(遅延秒数: {self.img_delay_sec})')
+        self.log_handler.logger.info(
+            f'- HTTP/2: {self.http2}')
+        self.log_handler.logger.info(
+            f'- HTMLの解析方法: {self.parser_backend}'
+            f'(解析プロセス数: {self.parse_workers})')
         self.log_handler.logger.info(
             f'- ファイルの保存先: {self.output_dir}')
         self.log_handler.logger.info(
             f'- ファイルの拡張子: {self.output_extension}'
         )
 
-    def crawl(self, url):
-        """リクエスト/レスポンスステータスコードに応じた処理"""
+    def crawl_many(self, urls, headers=None, page_types=None, spiders=None):
+        """
+        複数URLの並行crawl(レスポンスはURLの順番通りに返す)
+
+        Note:
+            headersはURLごとに追加するヘッダー(条件付きリクエスト等)のリスト
+            page_types/spidersはURLごとのページ種別/spiderのリスト
+            (プロセスプールで解析/抽出する場合のみ使用)
+            一時的なエラーの場合はレスポンスの代わりにTemporaryErrorを返す
+            許容モードでURL単位のエラーの場合はレスポンスの代わりにPageErrorを返す
+        """
+
+        # 追加するヘッダーがない場合
+        if headers is None:
+            headers = [None] * len(urls)
+        # ページ種別がない場合
+        if page_types is None:
+            page_types = [None] * len(urls)
+        # spiderがない場合
+        if spiders is None:
+            spiders = [None] * len(urls)
+
+        # fetch_engineモジュールのevent loopで各URLのcrawlを並行実行
+        return self.fetch_engine.gather(
+            [self.crawl_extract_async(url, h, page_type, spider)
+             for url, h, page_type, spider in zip(urls, headers, page_types, spiders)])
+
+    async def crawl_extract_async(self, url, headers=None, page_type=None, spider=None):
+        """
+        crawlと解析/抽出(プロセスプールを使用する場合)
+
+        Note:
+            レスポンスを取得できた時点で解析/抽出をプロセスプールに渡すため、
+            同じバッチの他のURLのcrawlと並行して解析が進む。
+            抽出結果はレスポンスのextractedとして保持し、parse_*関数で使用する。
+        """
+
+        r = await self.crawl_async(url, headers)
+        if not self.parse_pool or not spider or not spider.can_extract(page_type) \
+                or not isinstance(r, requests.Response):
+            return r
+
+        try:
+            r.extracted = await asyncio.wrap_future(
+                self.submit_extract(r, spider, page_type))
+        # プロセスプールで処理できなかった場合はcrawlerのスレッドで解析
+        except Exception as e:
+            self.log_handler.logger.warning(
+                f'[Parse] プロセスプールでの解析に失敗しました。{url}: {e!r}')
+        return r
+
+    def submit_extract(self, r, spider, page_type):
+        """
+        レスポンス本文の解析/抽出をプロセスプールに渡す
+
+        Note:
+            本文(バイト列)は共有メモリに書き込み、ワーカーには共有メモリの名前とspider名のみを渡す。
+            (デコード済みの文字列をpickleしてプロセス間で受け渡さない)
+            共有メモリは解析/抽出の完了時に解放する。
+        """
+
+        content = r.content
+        # Response.textと同じエンコード(ヘッダーにない場合は推定)
+        encoding = r.encoding or r.apparent_encoding
+        shm = SharedMemory(create=True, size=max(len(content), 1))
+        shm.buf[:len(content)] = content
+
+        def release(future):
+            shm.close()
+            shm.unlink()
+
+        try:
+            future = self.parse_pool.submit(
+                extract_shared, shm.name, len(content), encoding, spider.name, page_type)
+        except Exception:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return future
+
+    async def crawl_image_async(self, url):
+        """
+        画像のバックグラウンドcrawl(一時的なエラーの場合は待機して再試行)
+
+        Note:
+            ページの処理とは別に実行されるため、再試行の待機中もページの処理は継続。
+        """
+
+        attempt = 0
+        while True:
+            r = await self.crawl_stream_async(url)
+            # 一時的なエラー以外の場合もしくは再試行の上限を超えた場合
+            if not isinstance(r, TemporaryError) or attempt >= self.max_retries:
+                return r
+
+            attempt += 1
+            # 再試行までの待機秒数(指数関数的に増加)
+            backoff = self.retry_backoff * 2 ** (attempt - 1)
+            self.log_handler.logger.warning(
+                f'画像の再試行待ち({attempt}/{self.max_retries}回目、{backoff}s後): {url}')
+            # 処理結果のカウント
+            with self.count_lock:
+                self.result_count['リトライ数'] += 1
+                self.result_count['リトライ待機秒数'] += backoff
+            await asyncio.sleep(backoff)
+
+    async def crawl_stream_async(self, url, headers=None):
+        """
+        画像のcrawl(本文を受信しながら一時ファイルに書き込み)
+
+        Note:
+            リクエストと書き込みはバックグラウンドの枠で行い、レスポンスに一時ファイルのパス(temp_path)、
+            サイズ(img_size)とハッシュ値(img_hash)を追加して返す。最大サイズを超えた場合はNoneを返す。
+        """
+
+        r = await self.crawl_async(url, headers, stream=True, background=True)
+        # エラー/キャッシュ未取得の場合はそのまま返す
+        if r is None or isinstance(r, Exception):
+            return r
+
+        try:
+            result = await self.fetch_engine.run_background(
+                self.image_store.stream, r, self.img_max_size)
+        # 本文の受信中に接続断/タイムアウトした場合は再試行(一時ファイルはstream内で削除済み)
+        except requests.exceptions.RequestException as e:
+            self.log_handler.logger.warning(f'[Image] 画像の受信に失敗しました。{url}: {e}')
+            return TemporaryError(f'{type(e).__name__}: {url}')
+        # 最大サイズを超えた場合
+        if result is None:
+            self.log_handler.logger.warning(
+                f'[Image] 最大サイズ({self.img_max_size}bytes)を超えたため保存しません。{url}')
+            # 処理結果のカウント
+            with self.count_lock:
+                self.result_count['画像サイズ超過数'] += 1
+            return None
+
+        r.temp_path, r.img_size, r.img_hash = result
+        return r
+
+    async def crawl_async(
+            self, url, headers=None, stream=False, background=False, required=True):
+        """
+        リクエスト/ステータスコードに応じた処理
+
+        Note:
+            backgroundがTrueの場合(画像)はバックグラウンドの同時リクエスト数/送信間隔で処理。
+            requiredがFalseの場合(robots.txt等、存在しない場合もあるURL)は、
+            一時的ではないエラーでもエラー終了せずにNoneを返す。
+        """
 
         self.log_handler.logger.info('----- クロール -----')
 
@@ -222,52 +823,143 @@ class Crawler(Config):
                 '[Crawl] 予期せぬURLにリクエストしようとしたため処理を中止しました。'
                 f'URL: {url}'
             )
-            # エラー終了
-            self.error_handler(error_msg)
+            # エラー終了(許容モードの場合はPageErrorを返して他のリクエストは継続)
+            try:
+                self.page_error(error_msg)
+            except PageError as e:
+                return e
+
+        # オフラインの場合はキャッシュのみから取得
+        if self.offline:
+            return await self.crawl_offline(url, background)
 
         # リクエストとステータスコードに応じた処理
         try:
-            r = self.request_check_response(url)
-        # エラーによるリクエストのリトライ上限を超えた場合
-        except RetryError:
-            # エラーメッセージの定義
-            error_msg = (
-                '[Crawl] リクエストが正常に処理されませんでした。'
-                'ネットワーク環境の不具合もしくはWebページの一時的な不具合などが考えられます。'
-            )
-            # エラー終了
-            self.error_handler(error_msg)
+            r = await self.request_check_response(url, headers, stream, background)
+        # 一時的なエラーの場合(呼び出し元でfrontierに再追加)
+        except TemporaryError as e:
+            return e
+        # ネットワーク環境の不具合等でレスポンスを取得できない場合も一時的なエラーとする
+        except requests.exceptions.RequestException as e:
+            self.log_handler.logger.warning(f'[Crawl] リクエストに失敗しました。{url}: {e}')
+            # タイムアウト(408)として遅延秒数の自動調整に反映(エラーのためレイテンシは使用しない)
+            if not background:
+                self.scheduler.record_response(url, None, 408)
+            return TemporaryError(f'{type(e).__name__}: {url}')
         # レスポンスを取得できた場合
         else:
             # Noneが返ってきた場合(一時的ではないエラー)
             if not r:
+                # 存在しない場合もあるURLの場合は呼び出し元で処理
+                if not required:
+                    return None
                 # エラーメッセージの定義
                 error_msg = (
                     '[Crawl] リクエストが正常に処理されませんでした。'
                     'クライアントエラーもしくはサーバーエラーが考えられます。'
+                    f'URL: {url}'
                 )
-                # エラー終了
-                self.error_handler(error_msg)
+                # エラー終了(許容モードの場合はPageErrorを返して他のリクエストは継続)
+                try:
+                    self.page_error(error_msg)
+                except PageError as e:
+                    return e
 
             # 処理結果のカウント
-            self.result_count['レスポンス受信数'] += 1
+            with self.count_lock:
+                self.result_count['レスポンス受信数'] += 1
             return r
 
-    # stopはリトライ上限(値は上限数)
-    # waitは次のリトライまでの待機時間(値は指数関数的に待機時間を増加)
-    @retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1))
-    def request_check_response(self, url):
-        """リクエストを送りステータスコードの確認/リトライ処理"""
+    async def crawl_offline(self, url, background=False):
+        """
+        オフライン時のcrawl(キャッシュからの取得)
+
+        Note:
+            有効期限切れのキャッシュも使用し、遅延処理は行わない。
+            キャッシュが存在しない場合はリクエストを送らず、
+            未取得URLとして記録してNoneを返す(呼び出し元で処理をスキップ)。
+        """
+
+        run_blocking = self.get_run_blocking(background)
+        r = await run_blocking(self.load_cached_response, url)
+
+        # キャッシュが存在しない場合
+        if r is None:
+            self.log_handler.logger.warning(f'[Offline] キャッシュが存在しないためスキップ: {url}')
+            # 処理結果のカウント
+            with self.count_lock:
+                self.result_count['キャッシュ未取得数'] += 1
+            self.offline_gaps.append(url)
+            return None
+
+        # キャッシュの取得結果をログ表示
+        self.log_handler.logger.info(f'リクエストURL(オフライン): {r.url}')
+        self.log_handler.logger.info(f'ステータスコード: {r.status_code}')
+
+        # 処理結果のカウント
+        with self.count_lock:
+            self.result_count['ステータスコード'][r.status_code] += 1
+            self.result_count['レスポンス受信数'] += 1
+        return r
+
+    def load_cached_response(self, url):
+        """
+        キャッシュからレスポンスを生成(有効期限は確認しない)
+
+        Note:
+            CacheControlのcached_requestから有効期限の判定を除いた処理。
+            キャッシュが存在しない/破損している場合はNoneを返す。
+        """
+
+        # セッションの設定を反映したリクエストを定義
+        request = self.session_cache.prepare_request(
+            requests.Request('GET', url, headers=self.headers))
+        # URLに対応するアダプター(CacheControlAdapter)
+        adapter = self.session_cache.get_adapter(url)
+        controller = adapter.controller
+
+        try:
+            cache_data = controller.cache.get(controller.cache_url(url))
+            # キャッシュデータをurllib3のレスポンスに復元
+            resp = controller.serializer.loads(request, cache_data)
+        # キャッシュが破損している場合
+        except zlib.error:
+            return None
+        if not resp:
+            return None
+
+        # requestsのレスポンスとして返す
+        return adapter.build_response(request, resp, from_cache=True)
+
+    def get_run_blocking(self, background=False):
+        """同期処理の実行方法(バックグラウンドの場合は別枠の同時リクエスト数で実行)"""
+
+        if background:
+            return self.fetch_engine.run_background
+        return self.fetch_engine.run_blocking
+
+    async def request_check_response(
+            self, url, headers=None, stream=False, background=False):
+        """リクエストの送信とステータスコード確認(一時的なエラーの場合はTemporaryErrorを送出)"""
 
         # 一時的なエラーとするステータスコードを自己定義
         temporary_error_codes = (408, 500, 502, 503, 504)
 
-        # リクエスト前に負荷軽減の遅延処理
-        self.request_delay(self.delay_sec, self.randomize)
+        # キャッシュから取得できる場合
+        run_blocking = self.get_run_blocking(background)
+        if await run_blocking(self.is_cache_fresh, url):
+            self.log_handler.logger.info('リクエスト送信(キャッシュ使用のため遅延なし)...')
+        # 実際にリクエストを送る場合
+        else:
+            # リクエスト前に負荷軽減の遅延処理
+            await self.request_delay(url, background)
         # 処理結果のカウント
-        self.result_count['リクエスト送信数'] += 1
-        # Configクラスで定義したセッションによりリクエスト
-        r = self.session_cache.get(url, headers=self.headers, timeout=3.5)
+        with self.count_lock:
+            self.result_count['リクエスト送信数'] += 1
+        # Configクラスで定義したセッションによりリクエスト(スレッドプールで実行)
+        r = await run_blocking(
+            self.session_cache.get, url, headers={**self.headers, **(headers or {})},
+            timeout=3.5, stream=stream)
 
         # リクエストの結果をログ表示
         self.log_handler.logger.info(f'リクエストURL: {r.url}')
@@ -280,7 +972,12 @@ class Crawler(Config):
         self.log_handler.logger.info(f'キャッシュ: {r.from_cache}')
 
         # 処理結果のカウント
-        self.result_count['ステータスコード'][r.status_code] += 1
+        with self.count_lock:
+            self.result_count['ステータスコード'][r.status_code] += 1
+        # 実際にリクエストを送った場合は観測結果を遅延秒数の自動調整に反映
+        if not r.from_cache and not background:
+            self.scheduler.record_response(
+                url, r.elapsed.total_seconds(), r.status_code)
 
         # ステータスコードに異常があり、一時的ではないエラーでもない場合
         if 400 <= r.status_code and r.status_code not in temporary_error_codes:
@@ -292,94 +989,277 @@ class Crawler(Config):
             # レスポンスを返す
             return r
 
-        # 上記以外の場合(一時的なエラーの場合)は例外を発生させてtenacityモジュールのリトライ処理
-        raise Exception('Temporary Error')
+        # 上記以外の場合(一時的なエラーの場合)は例外を発生させて呼び出し元で再試行
+        raise TemporaryError(f'ステータスコード{r.status_code}: {url}')
 
-    def request_delay(self, sec=1, randomize=False):
-        """リクエストの遅延処理"""
+    def is_cache_fresh(self, url):
+        """
+        有効期限内のキャッシュの有無を確認
 
-        if randomize:
-            # 乱数の下限
-            min = sec * 0.5
-            # 乱数の上限
-            max = sec * 1.5
-            # uniform()はfloat対応の乱数生成処理
-            self.log_handler.logger.info(f'リクエスト送信(遅延{min}s～{max}s)...')
-            time.sleep(random.uniform(min, max))
-        else:
-            self.log_handler.logger.info(f'リクエスト送信(遅延{self.delay_sec}s)...')
-            time.sleep(sec)
+        Note:
+            CacheControlがリクエスト送信時に行う判定(cached_request)を事前に行う。
+            判定結果がTrueの場合、レスポンスはキャッシュから返されるため遅延処理は不要。
+        """
 
-    def execute_scraping(self, r):
-        """スクレイピングルートの設定/スクレイピングの実行"""
+        # セッションの設定を反映したリクエストを定義
+        request = self.session_cache.prepare_request(
+            requests.Request('GET', url, headers=self.headers))
+        # URLに対応するアダプター(CacheControlAdapter)
+        adapter = self.session_cache.get_adapter(url)
 
-        # 開始URLから取得したレスポンス
-        start_response = r
+        try:
+            return bool(adapter.controller.cached_request(request))
+        # キャッシュが破損している場合(CacheControlと同様に未取得とする)
+        except zlib.error:
+            return False
 
-        # cssセレクター(各一覧ページのページURL)
-        selector = 'ul.nav ul > li > a'
-        # 一覧ページのurlを取得
-        catalogue_urls = self.scrape_page_url(start_response, selector)
+    async def request_delay(self, url, background=False):
+        """
+        リクエストの遅延処理(ホスト単位)
 
-        # 一覧ページのurlを順に取り出す
-        for i, url in enumerate(catalogue_urls, start=1):
+        Note:
+            待機秒数はpolitenessモジュールのトークンバケットで予約。
+            待機はasyncio.sleepのため、他のホストへのリクエストは停止しない。
+        """
+
+        # リクエスト先のホストに対して送信を予約(画像は画像用の送信間隔)
+        scheduler = self.img_scheduler if background else self.scheduler
+        host, wait = scheduler.reserve(url)
+        self.log_handler.logger.info(f'リクエスト送信({host}: 遅延{wait:.2f}s)...')
+        await asyncio.sleep(wait)
+
+    def execute_scraping(self):
+        """
+        スクレイピングルートの設定/スクレイピングの実行
 
-            # 一覧ページの制限
-            if i > 2:
-                break
+        Note:
+            frontierからリクエストを同時リクエスト数ずつ取り出して並行してcrawlし、
+            レスポンスはリクエストを追加したspiderのページ種別(page_type)に応じたparse_*関数で処理。
+            各parse_*関数が次にcrawlするURLをfrontierに追加し、frontierが空になるまで繰り返す。
+            (複数のspiderのリクエストは同じfrontierから取り出し、送信間隔はホストごとに管理)
+            ページ種別はspiderごとに定義し、以下はspiderの基底クラスで共通の処理。
+                sitemap: サイトマップ(子のサイトマップもしくは詳細ページのURLを追加)
+                detail: 詳細ページ(スクレイピングデータの抽出/画像の取得を追加)
+            一時的なエラーのリクエストは再試行時刻を設定してfrontierに再追加するため、
+            再試行を待つ間も他のリクエストの処理は継続。
+            画像はimage_queueモジュールによりバックグラウンドで取得し、
+            完了した分をページの処理の合間に格納(frontierが空になった後は残りの完了を待機)。
+        """
 
+        # frontierに処理待ちのリクエストがある間
+        while self.frontier:
             # crawler制御の確認
             self.judgement_crawler_control()
 
-            # 一覧ページのレスポンスを取得
-            catalogue_response = self.crawl(url)
-
-            # 詳細ページのページ数
-            page_count = 1
-            # 詳細ページのループ処理
-            while True:
+            # 同時リクエスト数分のリクエストを取り出す
+            batch = self.frontier.pop_batch(self.concurrency)
+            # 再試行待ちのリクエストのみの場合
+            if not batch:
+                # crawler制御を確認できるよう最大1秒ずつ再試行時刻まで待機
+                time.sleep(min(self.frontier.wait_time(), 1))
+                continue
+            # 画像のリクエスト(途中経過/dead letterから復元した場合)はバックグラウンドで取得
+            batch = self.submit_images(batch)
+            if not batch:
+                continue
+            # 処理中のリクエストとして保持
+            self.in_progress = deque(batch)
+            # レスポンスを並行して取得(差分crawlの場合は条件付きリクエスト)
+            # (プロセスプールを使用する場合は取得できたレスポンスから順に解析/抽出も開始)
+            responses = self.crawl_many(
+                [request.url for request in batch],
+                [self.conditional_headers(request) for request in batch],
+                [request.page_type for request in batch],
+                [self.get_spider(request.spider) for request in batch])
+
+            # リクエストとレスポンスを順に取り出す
+            for request, r in zip(batch, responses):
                 # crawler制御の確認
                 self.judgement_crawler_control()
 
-                # cssセレクター(各詳細ページのページURL)
-                selector = 'h3 > a'
-                # 詳細ページのurlを取得
-                detail_urls = self.scrape_page_url(
-                    catalogue_response, selector)
-
-                # 詳細ページのurlを順に取り出す
-                for i, url in enumerate(detail_urls, start=1):
-                    # crawler制御の確認
-                    self.judgement_crawler_control()
-
-                    # 詳細ページのレスポンスを取得
-                    detail_response = self.crawl(url)
-                    # スクレイピングデータ(タグ情報)の抽出
-                    self.scrape_object(detail_response)
-
-                # 詳細ページの抽出終了につきカウント
-                page_count += 1
-                # 詳細ページの制限
-                if page_count > 2:
-                    break
-
-                # cssセレクター(次ページのURL)
-                selector = 'li.next > a'
-                # 次ページurlの取得
-                next_page_url = self.scrape_page_url(
-                    catalogue_response, selector, is_next=True)
-                # 次ページurlがある場合
-                if next_page_url:
-                    # 処理起点のレスポンスを次ページのレスポンスで上書き
-                    catalogue_response = self.crawl(next_page_url[0])
-                    # 上書きしたレスポンスで初めの処理(whileループ)に戻る
-                    self.log_handler.logger.info('>> 次のページに遷移')
-                # 次ページがない場合はループから抜ける
-                else:
-                    break
+                try:
+                    # 一時的なエラーの場合は再試行時刻を設定してfrontierに再追加
+                    if isinstance(r, TemporaryError):
+                        self.schedule_retry(request, r)
+                    # 許容モードでURL単位のエラーの場合
+                    elif isinstance(r, PageError):
+                        raise r
+                    # オフライン時にキャッシュが存在しない場合は処理しない
+                    elif r is not None:
+                        # リクエストを追加したspiderのページ種別に応じた処理
+                        spider = self.get_spider(request.spider)
+                        parse = getattr(spider, f'parse_{request.page_type}')
+                        # 解析する範囲の判定用にページ種別/spiderを保持
+                        r.page_type = request.page_type
+                        r.spider = spider
+                        started = time.perf_counter()
+                        parse(request, r)
+                        # 処理結果のカウント(解析方法ごとの比較用)
+                        self.result_count['ページ解析秒数'] = round(
+                            self.result_count['ページ解析秒数']
+                            + time.perf_counter() - started, 3)
+                # URL単位のエラー(許容モードの場合のみ)はdead letterに記録して処理を継続
+                except PageError as e:
+                    self.add_dead_letter(request, e)
+                # 処理済みのリクエストを除外
+                self.in_progress.popleft()
+
+            # 取得が完了した画像の格納
+            self.process_images()
+
+            # 一定間隔で途中経過を保存
+            if time.time() - self.last_checkpoint_time >= self.checkpoint_interval:
+                self.save_checkpoint()
+
+        # 画像の取得が完了するまで待機
+        while self.image_queue:
+            # crawler制御の確認
+            self.judgement_crawler_control()
+            # 制御を確認できるよう最大1秒ずつ待機
+            self.image_queue.wait(timeout=1)
+            self.process_images()
+
+            # 一定間隔で途中経過を保存
+            if time.time() - self.last_checkpoint_time >= self.checkpoint_interval:
+                self.save_checkpoint()
+
+        # 画像の確定が完了するまで待機
+        self.image_store.flush()
+
         # 処理結果をログ表示
         self.display_result()
 
+    def submit_images(self, batch):
+        """画像のリクエストをバックグラウンドの取得に回し、残りのリクエストを返す"""
+
+        for request in batch:
+            if request.page_type == 'image':
+                self.image_queue.submit(request, self.crawl_image_async(request.url))
+        return [request for request in batch if request.page_type != 'image']
+
+    def process_images(self):
+        """バックグラウンドで取得が完了した画像の格納"""
+
+        for request, r in self.image_queue.pop_done():
+            try:
+                # 再試行の上限を超えた場合
+                if isinstance(r, TemporaryError):
+                    # エラーメッセージの定義
+                    error_msg = (
+                        '[Image] 画像の取得が正常に処理されませんでした。'
+                        f'({r})'
+                    )
+                    # エラー終了
+                    self.page_error(error_msg)
+                # 許容モードでURL単位のエラーの場合
+                elif isinstance(r, PageError):
+                    raise r
+                # オフライン時にキャッシュが存在しない/最大サイズを超えた場合は処理しない
+                elif r is not None:
+                    self.parse_image(request, r)
+            # URL単位のエラー(許容モードの場合のみ)はdead letterに記録して処理を継続
+            except PageError as e:
+                self.add_dead_letter(request, e)
+
+    def schedule_retry(self, request, error):
+        """一時的なエラーのリクエストを再試行待ちとしてfrontierに再追加"""
+
+        request.attempt += 1
+        # 再試行の上限を超えた場合
+        if request.attempt > self.max_retries:
+            # 中断時の途中経過には処理中のリクエストとして保存されるため、
+            # 再開時は再試行回数を数え直す
+            request.attempt = 0
+            # エラーメッセージの定義
+            error_msg = (
+                '[Crawl] リクエストが正常に処理されませんでした。'
+                'ネットワーク環境の不具合もしくはWebページの一時的な不具合などが考えられます。'
+                f'({error})'
+            )
+            # エラー終了
+            self.page_error(error_msg)
+
+        # 再試行までの待機秒数(指数関数的に増加)
+        backoff = self.retry_backoff * 2 ** (request.attempt - 1)
+        request.not_before = time.time() + backoff
+        self.frontier.defer(request)
+        self.log_handler.logger.warning(
+            f'再試行待ち({request.attempt}/{self.max_retries}回目、{backoff}s後): {request.url}')
+        # 処理結果のカウント
+        with self.count_lock:
+            self.result_count['リトライ数'] += 1
+            self.result_count['リトライ待機秒数'] += backoff
+
+    def add_dead_letter(self, request, error):
+        """処理に失敗したリクエストをdead letterに記録"""
+
+        self.dead_letter.add(request, str(error), traceback.format_exc())
+        self.log_handler.logger.warning(f'dead letterに記録: {request.url}')
+        # 処理結果のカウント
+        self.result_count['エラーURL数'] += 1
+
+    def push_request(self, url, page_type, meta=None, spider=None):
+        """frontierへのリクエスト追加(取得済みURLの場合はスキップ)"""
+
+        # 正規化したURLで取得(正規化の結果はキャッシュ済み)
+        url = canonicalize_url(url)
+        if not self.frontier.push(CrawlRequest(url, page_type, meta, spider=spider)):
+            self.log_handler.logger.info(f'取得済みのためスキップ: {url}')
+            # 処理結果のカウント
+            self.result_count['重複URL数'] += 1
+
+    def get_spider(self, name):
+        """spider名に対応するspider(spider名がないリクエストは最初のspiderで処理)"""
+
+        if name is None:
+            return self.spiders[0]
+        return self.spider_index[name]
+
+    def count_items(self):
+        """全spiderの抽出済みのスクレイピングデータ数"""
+
+        return sum(len(spider.items.items) for spider in self.spiders)
+
+    def scrape_item(self, spider, request, r):
+        """詳細ページのスクレイピング(spiderのparse_detailから呼び出し)"""
+
+        # 差分crawlの場合
+        if self.incremental:
+            # 前回から変更がない場合は前回のスクレイピングデータを再利用
+            record = self.recrawl_store.get_unchanged_record(request.url, r)
+            if record:
+                self.reuse_record(spider, record)
+                return
+
+        # スクレイピングデータ(タグ情報)の抽出
+        self.scrape_object(spider, r)
+
+        # 差分crawlの場合はバリデーターと抽出したスクレイピングデータを保存
+        if self.incremental:
+            self.recrawl_store.save(request.url, r, spider.items.items[-1])
+
+    def conditional_headers(self, request):
+        """差分crawlの条件付きリクエストのヘッダー(詳細ページのみ)"""
+
+        if not self.incremental or request.page_type != 'detail':
+            return {}
+        return self.recrawl_store.conditional_headers(request.url)
+
+    def reuse_record(self, spider, record):
+        """前回のスクレイピングデータの再利用"""
+
+        self.log_handler.logger.info(
+            f'変更がないため前回のデータを再利用: {record["url"]}')
+        # Itemsモジュールに格納
+        spider.items.items.append(record)
+        # 処理結果のカウント
+        self.result_count['再利用データ数'] += 1
+
+        # 画像出力の必要がある場合は前回の画像URLから取得
+        if self.img_out and spider.image_field \
+                and record[spider.image_field] != 'none':
+            self.download_img(record[spider.image_field], spider)
+
     def judgement_crawler_control(self):
         """
         crawlerのステータス/フラグの確認とそれに応じた制御
@@ -420,19 +1300,17 @@ class Crawler(Config):
     def scrape_page_url(self, r, selector, is_xml=False, is_next=False):
         """レスポンスからページURLを抽出"""
 
-        # lxmlのレスポンスである場合
-        if not is_xml:
-            # lxmlパーサーで解析して全体のタグ情報を取得
-            soup = BeautifulSoup(r.text, 'lxml')
-        # xmlのレスポンスである場合
-        else:
-            # xmlパーサーで解析して全体のタグ情報を取得
-            soup = BeautifulSoup(r.text, 'xml')
-
         # 抽出したurlの格納場所
         urls = []
-        # ページURLに該当するタグ情報を抽出
-        url_tags = soup.select(selector)
+        # プロセスプールで抽出済みの場合はその結果を使用
+        extracted = getattr(r, 'extracted', None)
+        if not is_xml and extracted and selector in extracted:
+            url_tags = extracted[selector]
+        else:
+            # 全体のタグ情報を取得(lxmlもしくはxmlパーサーの解析結果)
+            soup = self.parse_document(r, 'xml' if is_xml else 'lxml')
+            # ページURLに該当するタグ情報を抽出
+            url_tags = soup.select(selector)
 
         # ページタグを抽出できない場合
         if not url_tags:
@@ -445,7 +1323,7 @@ class Crawler(Config):
             error_msg = (
                 '[Scrape page url] ページURLのスクレイピングに失敗しました。(NoneType)'
             )
-            self.error_handler(error_msg)
+            self.page_error(error_msg)
 
         # ページタグを抽出できた場合は順に取り出す
         for url_tag in url_tags:
@@ -465,136 +1343,142 @@ class Crawler(Config):
                     '[Scrape page url] ページURLのスクレイピングに失敗しました。(KeyError)'
                 )
                 # エラー終了
-                self.error_handler(error_msg)
+                self.page_error(error_msg)
             # 無事にURLを取得できた場合
             else:
-                # 必要に応じてURLの整形処理して格納
-                url = self.shaping_url(url, r)
+                # レスポンスのURLを基準に相対URLを解決して正規化
+                try:
+                    url = canonicalize_url(url, r.url)
+                # 想定していないURL(http/https以外等)を取得した場合
+                except ValueError:
+                    # エラーメッセージの定義
+                    error_msg = (
+                        '[Canonicalize url] 予期せぬURLをスクレイピングしたため処理を中止します。'
+                        f'URL: {url}'
+                    )
+                    # エラー終了
+                    self.page_error(error_msg)
                 urls.append(url)
         return urls
 
-    def shaping_url(self, url, r):
-        """urlの整形処理(必要な場合のみ)"""
-
-        # 必要に応じてURLの種類ごとに様々な整形処理を追加
-        if re.match('catalogue/', url):
-            shaped_url = urljoin('https://books.toscrape.com/', url)
-            return shaped_url
-        elif re.match(r'../../', url):
-            rep_url = url.replace('../', '')
-            shaped_url = urljoin('https://books.toscrape.com/catalogue/', rep_url)
-            return shaped_url
-        elif re.match(r'page', url):
-            base_url = r.url.replace('index.html', '')
-            shaped_url = urljoin(base_url, url)
-            return shaped_url
-        # 想定していないURLを取得した場合
-        else:
-            # エラーメッセージの定義
-            error_msg = (
-                '[Shaping url] 予期せぬURLをスクレイピングしたため処理を中止します。'
-                f'URL: {url}'
-            )
-            # エラー終了
-            self.error_handler(error_msg)
+    def parse_document(self, r, parser='lxml'):
+        """
+        レスポンスの解析結果(BeautifulSoup)を返す
+
+        Note:
+            同じレスポンスに複数のセレクターを適用する場合(一覧ページの詳細ページURL/次ページURL等)も
+            解析は1回のみとするため、解析結果はパーサーごとにレスポンスに保持して再利用する。
+            (レスポンスと同時に破棄されるため、処理済みのページの解析結果は残らない)
+            parser_backendが'lxml'の場合、HTMLはlxml_parserモジュールで解析し、
+            cssセレクターはXPathに変換してコンパイルしたものを使用する(抽出結果はBeautifulSoupと同じ)。
+            ページ種別がspiderのparse_targetsに該当する場合は指定したタグのみを解析する(部分解析)。
+        """
 
-    def scrape_object(self, r):
-        """対象のページから特定の情報(タグ情報)を抽出"""
+        if not hasattr(r, 'documents'):
+            r.documents = {}
+        if parser not in r.documents:
+            # xmlの場合はgzipを展開した本文を解析
+            if parser == 'xml':
+                r.documents[parser] = BeautifulSoup(self.read_xml(r), parser)
+            # HTMLの場合はページ種別に応じたタグのみを解析(ページ種別がない/該当しない場合は全体)
+            else:
+                spider = getattr(r, 'spider', None)
+                target = None
+                if spider:
+                    target = spider.parse_targets.get(getattr(r, 'page_type', None))
+                r.documents[parser] = build_document(r.text, self.parser_backend, target)
+        return r.documents[parser]
 
-        self.log_handler.logger.info('----- スクレイピング -----')
+    def read_xml(self, r):
+        """XMLのレスポンス本文(gzipで圧縮されたサイトマップの場合は展開)"""
 
-        # レスポンスからページ情報を取得
-        soup = BeautifulSoup(r.text, 'lxml')
+        content = r.content
+        # gzipのマジックナンバーで判定(Content-Encodingの場合はrequestsで展開済み)
+        if content[:2] == b'\x1f\x8b':
+            content = gzip.decompress(content)
+        return content
 
-        # 一度全体のタグ情報から範囲を絞って抽出
-        contents = soup.select_one('article > div.row')
-        table = soup.find('table')
+    def scrape_object(self, spider, r):
+        """対象のページから特定の情報を抽出(抽出する項目はspiderの抽出計画による)"""
 
-        # この段階で抽出できなかった場合
-        if not contents or not table:
+        self.log_handler.logger.info('----- スクレイピング -----')
+
+        # プロセスプールで抽出済みの場合はその結果を使用
+        if hasattr(r, 'extracted'):
+            values = r.extracted
+        # レスポンスからページ情報を取得(解析済みの場合は再利用)して値を抽出
+        else:
+            values = spider.extraction_plan.extract(self.parse_document(r))
+
+        # 特定要素を抽出できなかった場合
+        if values is None:
             # エラーメッセージの定義
             error_msg = (
                 '[Scrape object] 特定要素のスクレイピングに失敗しました。'
             )
             # エラー終了
-            self.error_handler(error_msg)
+            self.page_error(error_msg)
 
-        # 抽出した1件分のタグ情報をdict型で集約
-        data = {
-            'url': r.url,
-            'title': contents.find('h1'),
-            'price': table.select_one('th:-soup-contains("excl")+td'),
-            'star': contents.select_one('div.product_main p.star-rating'),
-            'reviews': table.select_one('th:-soup-contains("reviews")+td'),
-            'stock': table.select_one(
-                'th:-soup-contains("Availability")+td'),
-            'upc': table.select_one('th:-soup-contains("UPC")+td'),
-            'image_url': contents.select_one('div.item > img'),
-        }
+        # 抽出した1件分の値をdict型で集約
+        data = {'url': r.url, **values}
 
-        # Itemsモジュールに渡す
-        self.items.add_items(data)
+        # spiderのItemsモジュールに渡す
+        spider.items.add_items(data)
         # 処理結果のスクレイピング項目にカウント
         self.result_count['スクレイピング処理数'] += len(data)
 
         # 画僧出力の必要がある場合
-        if self.img_out:
-            self.scrape_img_content(contents)
-
-    def scrape_img_content(self, tag_data):
-        """画像データの抽出"""
+        if self.img_out and spider.image_field:
+            self.scrape_img_content(spider, data[spider.image_field])
 
-        # 画像データのファイル名を定義
-        img_title = self.setup_img_title(self.img_title)
-        # cssセレクター
-        img_selector = 'div.item > img'
-        # imgタグを抽出
-        img_tag = tag_data.select_one(img_selector)
+    def scrape_img_content(self, spider, src):
+        """画像データの抽出(Itemsモジュールで正規化済みの画像URL)"""
 
-        # セレクターの誤りによるNoneTypeを取得した場合
-        if not img_tag:
+        # セレクターの誤り/src属性がない/正規化できないことにより画像URLがない場合
+        if src == 'none':
             self.log_handler.logger.warning(
                 '[Scrape object] 画像出力に失敗しました。(NoneType)'
             )
             # 処理終了
             return
 
-        # imgタグからsrc属性を抽出
-        try:
-            src = img_tag.attrs['src']
-        # src属性が存在しない場合(念のため)
-        except KeyError:
-            self.log_handler.logger.warning(
-                '[Scrape object] 画像出力に失敗しました。(KeyError)'
-            )
-            # 処理終了
+        # 画像データの取得
+        self.download_img(src, spider)
+
+    def download_img(self, img_src, spider):
+        """画像データの取得(バックグラウンドで取得し、取得後はparse_imageで処理)"""
+
+        # 取得済みのURLの場合
+        if not self.frontier.visit(img_src):
+            self.log_handler.logger.info(f'取得済みのためスキップ: {img_src}')
+            # 処理結果のカウント
+            self.result_count['重複URL数'] += 1
             return
 
-        # 無事にURLが取得できた場合(必要に応じてURLの整形処理)
-        img_src = urljoin('https://books.toscrape.com/', src)
+        self.submit_images([CrawlRequest(img_src, 'image', spider=spider.name)])
+
+    def parse_image(self, request, r):
+        """画像の処理"""
 
-        # ソースタグのURLをcrawl(リクエスト)
-        r = self.crawl(img_src)
-        # Itemsモジュールの属性に画像の名前と画像データのバイト文字列を渡す
-        self.items.img_data[img_title] = r.content
+        # 一時ファイルの確定をimage_storeモジュールに渡してspiderのItemsモジュールにメタデータを格納
+        spider = self.get_spider(request.spider)
+        spider.items.img_data[request.url] = self.image_store.put(
+            request.url, r.temp_path, r.img_size, r.img_hash)
 
-    def setup_img_title(self, title=None):
-        """画像の名前設定(重複時の上書き防止)"""
+    def page_error(self, error_msg):
+        """
+        URL単位のエラー発生時の処理
 
-        # タイムスタンプの取得
-        time_stamp = str(time.time()).replace('.', '')
-        # 名前の指定がない場合
-        if not title:
-            # 上記のタイムスタンプを返す(重複の可能性なし)
-            return time_stamp
+        Note:
+            許容モードの場合はPageErrorを送出し、呼び出し元でdead letterに記録して処理を継続。
+            許容モード以外の場合はerror_handlerによりエラー終了。
+        """
 
-        # 名前の指定があり、Itemsモジュールに既に渡された名前と重複している場合
-        if title in self.items.img_data.keys():
-            # 上書き防止のため指定された名前に追記して返す
-            return f'{title}_copy({time_stamp})'
+        if not self.tolerant:
+            self.error_handler(error_msg)
 
-        # 名前の指定があり、Itemsモジュールに既に渡された名前とも重複していない場合
-        return title
+        self.log_handler.logger.error(error_msg)
+        raise PageError(error_msg)
 
     def error_handler(self, error_msg):
         """エラー発生時の処理を一元管理"""
@@ -622,13 +1506,25 @@ class Crawler(Config):
         # 例外発生により本モジュールを終了
         raise Exception(error_msg)
 
+    def copy_result_count(self):
+        """
+        処理結果のカウントの複製
+
+        Note:
+            画像のバックグラウンド取得による更新中に走査しないよう、ロックを取得して複製する。
+        """
+
+        with self.count_lock:
+            return {k: dict(v) if isinstance(v, dict) else v
+                    for k, v in self.result_count.items()}
+
     def display_result(self):
         """処理結果の表示処理"""
 
         self.log_handler.logger.info('===== 処理終了 =====')
 
         # 処理結果のカウントからkey/valueを取り出す
-        for k, v in self.result_count.items():
+        for k, v in self.copy_result_count().items():
             # ステータスコードの場合
             if k == 'ステータスコード':
                 # valueがdict型のため更にループで取り出す
@@ -640,6 +1536,40 @@ class Crawler(Config):
             # ステータスコード以外のログ表示
             self.log_handler.logger.info(f'> {k}: {v}')
 
+        # 遅延秒数を自動調整した場合
+        if self.auto_throttle:
+            # ホストごとに調整後の遅延秒数をログ表示
+            for host, bucket in self.scheduler.buckets.items():
+                self.log_handler.logger.info(
+                    f'> 遅延秒数: {host}[{bucket.delay_sec:.2f}s]')
+
+        # ホストごとの接続数とリクエスト数をログ表示(差分はkeep-aliveによる再利用)
+        for host, (connections, num_requests) in \
+                self.http_adapter.connection_stats().items():
+            self.log_handler.logger.info(
+                f'> コネクション: {host}[接続数{connections}/リクエスト数{num_requests}]')
+
+        # spiderごとのスクレイピングデータ数をログ表示
+        for spider in self.spiders:
+            self.log_handler.logger.info(
+                f'> スクレイピングデータ数: {spider.name}[{len(spider.items.items)}]')
+
+        # URLの正規化のキャッシュのヒット数/ミス数をログ表示
+        cache_info = default_canonicalizer.cache_info()
+        self.log_handler.logger.info(
+            f'> URL正規化キャッシュ: ヒット[{cache_info.hits}]/ミス[{cache_info.misses}]')
+
+        # dead letterに記録した場合
+        if self.result_count['エラーURL数']:
+            self.log_handler.logger.warning(
+                f'> dead letterの保存先: {self.dead_letter.path}')
+
+        # 画像を保存した場合
+        if self.image_store.stored_count or self.image_store.duplicate_count:
+            self.log_handler.logger.info(
+                f'> 画像の保存: 新規[{self.image_store.stored_count}]/'
+                f'保存済み[{self.image_store.duplicate_count}]')
+
         # 経過時間の定義
         elapsed_time = int(time.time() - self.execute_time)
         # 経過時間のログ表示
@@ -0,0 +1,67 @@
+# 標準ライブラリ
+from datetime import datetime
+import json
+import os
+
+# 自己定義モジュール
+from frontier import CrawlRequest
+
+
+class DeadLetter(object):
+    """
+    処理に失敗したリクエストの記録(JSON Lines形式)
+
+    Note:
+        1行につき1リクエストを以下の形式で追記。
+            url/page_type/meta/spider: 再実行に必要なリクエスト情報
+            reason: エラーメッセージ
+            traceback: エラー発生箇所
+            time: 記録日時
+    """
+
+    def __init__(self, path):
+        # 保存先のファイルパス
+        self.path = path
+
+    def exists(self):
+        """記録の有無を確認"""
+
+        return os.path.exists(self.path)
+
+    def add(self, request, reason, traceback):
+        """失敗したリクエストの追記"""
+
+        record = {
+            'url': request.url,
+            'page_type': request.page_type,
+            'meta': request.meta,
+            'spider': request.spider,
+            'reason': reason,
+            'traceback': traceback,
+            'time': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def load(self):
+        """記録したリクエストの読み込み(同じURLは最後の記録のみ)"""
+
+        requests = {}
+        if not self.exists():
+            return []
+
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                requests[record['url']] = CrawlRequest(
+                    record['url'], record['page_type'], record['meta'],
+                    spider=record.get('spider'))
+        return list(requests.values())
+
+    def clear(self):
+        """記録の削除"""
+
+        if self.exists():
+            os.remove(self.path)
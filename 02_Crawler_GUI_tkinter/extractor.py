@@ -0,0 +1,192 @@
+# 標準ライブラリ
+from multiprocessing.shared_memory import SharedMemory
+
+# 外部ライブラリ
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+# 自己定義モジュール
+from lxml_parser import LxmlDocument, LxmlTag, compile_selector
+from table_index import TableIndex
+
+
+# ワーカープロセスのspiderごとの抽出計画/解析の設定(init_worker()で設定)
+worker_settings = {}
+
+
+class TagData(object):
+    """
+    タグのテキストと属性
+
+    Note:
+        解析結果のタグ(BeautifulSoup/lxml)はプロセス間で受け渡せないため、
+        Itemsモジュール等で使用する.text/.attrsの値のみを取り出して保持する。
+    """
+
+    def __init__(self, tag):
+        self.text = tag.text
+        self.attrs = dict(tag.attrs)
+
+
+def build_document(text, parser_backend='bs4', target=None):
+    """
+    HTMLの解析(targetが(タグ名, 属性)の場合は該当するタグのみを解析)
+
+    Note:
+        bs4: SoupStrainerにより該当するタグ以外のツリーを構築しない
+        lxml: 該当するタグを含む範囲のみを切り出して解析
+    """
+
+    names, attrs = target or (None, None)
+    # lxmlで解析する場合(BeautifulSoupと同じインターフェースのラッパー)
+    if parser_backend == 'lxml':
+        if isinstance(names, str):
+            names = [names]
+        return LxmlDocument(text, names)
+
+    strainer = SoupStrainer(names, attrs) if names else None
+    return BeautifulSoup(text, 'lxml', parse_only=strainer)
+
+
+def extract_links(soup, selectors):
+    """一覧系のページからcssセレクターごとのタグを抽出"""
+
+    return {selector: [TagData(tag) for tag in soup.select(selector)]
+            for selector in selectors}
+
+
+def compile_select_one(selector, parser_backend='bs4'):
+    """cssセレクターをコンパイルし、タグから最初の該当タグを返す関数を返す"""
+
+    # lxmlの場合はXPathに変換してコンパイル
+    if parser_backend == 'lxml':
+        xpath = compile_selector(selector)
+
+        def select_one(tag):
+            elements = xpath(tag.element)
+            return LxmlTag(elements[0]) if elements else None
+        return select_one
+
+    return soupsieve.compile(selector).select_one
+
+
+class ExtractionPlan(object):
+    """
+    スクレイピング項目の定義(extraction_spec)をコンパイルした抽出計画
+
+    Note:
+        定義は開始時に1回のみ解釈し、cssセレクターはパーサーに応じてコンパイルしておく。
+        タグから値(テキスト/属性)の取得はextract()で行い、
+        値の整形処理はItemsモジュールがprocessors(項目名, 整形処理名)により行う。
+        定義の形式は以下の通り。
+            scopes: {範囲名: {'selector': cssセレクター, 'table': 見出しとセルの表の場合はTrue}}
+            fields: [{'name': 項目名, 'scope': 範囲名,
+                      'selector': cssセレクター(表の場合は'header': 見出しに含まれる文字列),
+                      'attr': 属性名(省略時はテキスト), 'index': 複数の値を持つ属性の位置,
+                      'process': Itemsモジュールの整形処理名}]
+    """
+
+    def __init__(self, spec, parser_backend='bs4'):
+        # 範囲(範囲名, 範囲を抽出する関数, 表の場合はTrue)
+        self.scopes = [
+            (name, compile_select_one(scope['selector'], parser_backend),
+             scope.get('table', False))
+            for name, scope in spec['scopes'].items()]
+        # 項目(項目名, 範囲名, 抽出する関数(表の場合はNone), 見出し, 属性名, 属性の位置)
+        self.fields = []
+        for field in spec['fields']:
+            select_one = None
+            if 'header' not in field:
+                select_one = compile_select_one(field['selector'], parser_backend)
+            self.fields.append((
+                field['name'], field['scope'], select_one, field.get('header'),
+                field.get('attr'), field.get('index')))
+        # 整形処理(項目名, Itemsモジュールの整形処理名)
+        self.processors = [
+            (field['name'], field['process'])
+            for field in spec['fields'] if field.get('process')]
+        # 表の見出し(部分一致)と実際の見出しの対応(この抽出計画のページ間で共有)
+        self.resolved_headers = {}
+
+    def extract(self, soup):
+        """項目ごとの値(取得できない項目はNone)を返す(範囲を抽出できない場合はNone)"""
+
+        # 一度全体のタグ情報から範囲を絞って抽出
+        scopes = {}
+        for name, select_one, is_table in self.scopes:
+            tag = select_one(soup)
+            if tag is None:
+                return None
+            # 表は見出しとセルの索引として1回のみ走査
+            scopes[name] = TableIndex(tag, self.resolved_headers) if is_table else tag
+
+        values = {}
+        for name, scope, select_one, header, attr, index in self.fields:
+            if select_one is None:
+                tag = scopes[scope].get(header)
+            else:
+                tag = select_one(scopes[scope])
+            values[name] = self.get_value(tag, attr, index)
+        return values
+
+    @staticmethod
+    def get_value(tag, attr=None, index=None):
+        """タグのテキストもしくは属性の値(タグ/属性がない場合はNone)"""
+
+        if tag is None:
+            return None
+        if attr is None:
+            return tag.text
+
+        value = tag.attrs.get(attr)
+        # 複数の値を持つ属性(class等)の場合は指定した位置の値
+        if index is not None:
+            return value[index] if value and len(value) > index else None
+        return value
+
+
+def extract(soup, page_type, plan, link_selectors):
+    """ページ種別に応じた抽出(詳細ページは抽出計画により値を取得)"""
+
+    if page_type == 'detail':
+        return plan.extract(soup)
+    return extract_links(soup, link_selectors[page_type])
+
+
+def init_worker(spiders, parser_backend):
+    """
+    ワーカープロセスの初期化(抽出計画はプロセスごとに1回のみコンパイル)
+
+    Note:
+        spidersはspider名と(スクレイピング項目の定義, 解析するタグ, 一覧系のcssセレクター)の対応。
+    """
+
+    worker_settings['parser_backend'] = parser_backend
+    worker_settings['spiders'] = {
+        name: {
+            'plan': ExtractionPlan(spec, parser_backend),
+            'parse_targets': parse_targets,
+            'link_selectors': link_selectors,
+        }
+        for name, (spec, parse_targets, link_selectors) in spiders.items()}
+
+
+def extract_shared(shm_name, size, encoding, spider, page_type):
+    """
+    共有メモリ上のレスポンス本文の解析/抽出(プロセスプールのワーカーで実行)
+
+    Note:
+        本文は呼び出し元が共有メモリに書き込んだバイト列を参照するため、
+        文字列をpickleしてプロセス間で受け渡さない。
+        デコードはrequestsのResponse.textと同じく置換文字を許容する。
+    """
+
+    shm = SharedMemory(name=shm_name)
+    try:
+        text = str(shm.buf[:size], encoding, errors='replace')
+    finally:
+        shm.close()
+    settings = worker_settings['spiders'][spider]
+    soup = build_document(
+        text, worker_settings['parser_backend'], settings['parse_targets'].get(page_type))
+    return extract(soup, page_type, settings['plan'], settings['link_selectors'])
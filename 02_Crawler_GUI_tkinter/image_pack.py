@@ -0,0 +1,190 @@
+# 標準ライブラリ
+import mmap
+import os
+import shutil
+import struct
+
+
+# インデックスの先頭に書き込む識別子
+INDEX_MAGIC = b'IMGPACK1'
+# インデックスに記録できる拡張子の最大バイト数(ASCIIのみ)
+EXTENSION_SIZE = 8
+# インデックス1件の形式(ハッシュ値(sha256), 開始位置, サイズ, 拡張子)
+INDEX_RECORD = struct.Struct(f'>32sQQ{EXTENSION_SIZE}s')
+
+
+def pack_paths(path):
+    """パック(拡張子なしのパス)に対応する(本体, インデックス)のファイルパス"""
+
+    return f'{path}.blob', f'{path}.idx'
+
+
+class ImagePackWriter(object):
+    """
+    画像データのパック(単一ファイル)への書き込み
+
+    Note:
+        画像データは本体ファイル({path}.blob)の末尾に追記し、
+        (ハッシュ値, 開始位置, サイズ, 拡張子)をインデックス({path}.idx)に保存する。
+        インデックスはハッシュ値の順に並べた固定長のレコードのため、
+        ImagePackReaderでmmapした上で二分探索できる。
+        インデックスはsync()のたびに書き直し、中断等でインデックスに
+        記録されていない本体の末尾は次回の書き込み開始時に切り詰める。
+    """
+
+    def __init__(self, path):
+        # 本体/インデックスのファイルパス
+        self.blob_path, self.index_path = pack_paths(path)
+        # ハッシュ値(bytes)と(開始位置, サイズ, 拡張子)の対応
+        self.entries = {}
+        # 前回までのインデックスを読み込み
+        if os.path.exists(self.index_path):
+            with ImagePackReader(path) as reader:
+                for digest, offset, size, extension in reader.records():
+                    self.entries[digest] = (offset, size, extension)
+
+        # インデックスに記録済みの末尾までで本体を切り詰めて追記
+        end = max((offset + size for offset, size, _ in self.entries.values()),
+                  default=0)
+        self.blob = open(self.blob_path, 'ab')
+        self.blob.truncate(end)
+        self.blob.seek(end)
+
+    def __contains__(self, digest):
+        return bytes.fromhex(digest) in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, digest, file_path, extension):
+        """ファイルの内容を本体の末尾に追記(同じハッシュ値の画像は追記しない)"""
+
+        # 固定長のレコードに収まらない拡張子はsync()で切り詰め/失敗するため追記前に検出
+        if not extension.isascii() or len(extension) > EXTENSION_SIZE:
+            raise ValueError(f'画像のパックに記録できない拡張子です: {extension}')
+
+        key = bytes.fromhex(digest)
+        if key in self.entries:
+            return False
+
+        offset = self.blob.tell()
+        with open(file_path, 'rb') as f:
+            shutil.copyfileobj(f, self.blob)
+        self.entries[key] = (offset, self.blob.tell() - offset, extension)
+        return True
+
+    def sync(self):
+        """本体の書き込みを確定し、インデックスを書き直す"""
+
+        self.blob.flush()
+        os.fsync(self.blob.fileno())
+
+        # 一時ファイルに書き込んでから置き換え(書き込み中の中断でも前回のインデックスを保持)
+        temp_path = f'{self.index_path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(INDEX_MAGIC)
+            for key in sorted(self.entries):
+                offset, size, extension = self.entries[key]
+                f.write(INDEX_RECORD.pack(
+                    key, offset, size, extension.encode('ascii')))
+        os.replace(temp_path, self.index_path)
+
+    def close(self):
+        self.sync()
+        self.blob.close()
+
+
+class ImagePackReader(object):
+    """
+    画像データのパックの読み込み
+
+    Note:
+        本体/インデックスともにmmapで開くため、件数が多い場合も
+        ファイル全体を読み込まずにハッシュ値から画像データを参照できる。
+    """
+
+    def __init__(self, path):
+        blob_path, index_path = pack_paths(path)
+        self.index_file = open(index_path, 'rb')
+        self.blob_file = open(blob_path, 'rb')
+        # 空のファイルはmmapできないため、レコードがない場合はbytesで代用
+        self.index = self.map(self.index_file)
+        self.blob = self.map(self.blob_file)
+        if self.index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f'画像のパックのインデックスではありません: {index_path}')
+        # レコード数
+        self.count = (len(self.index) - len(INDEX_MAGIC)) // INDEX_RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, digest):
+        return self.find(bytes.fromhex(digest)) is not None
+
+    @staticmethod
+    def map(f):
+        """ファイルを読み込み専用でmmap"""
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def record(self, i):
+        """i番目のレコード(ハッシュ値, 開始位置, サイズ, 拡張子)"""
+
+        digest, offset, size, extension = INDEX_RECORD.unpack_from(
+            self.index, len(INDEX_MAGIC) + i * INDEX_RECORD.size)
+        return digest, offset, size, extension.rstrip(b'\0').decode('ascii')
+
+    def records(self):
+        """全レコードをハッシュ値の順に返す"""
+
+        for i in range(self.count):
+            yield self.record(i)
+
+    def find(self, key):
+        """ハッシュ値(bytes)のレコードを二分探索(見つからない場合はNone)"""
+
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            record = self.record(mid)
+            if record[0] == key:
+                return record
+            if record[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def get(self, digest):
+        """ハッシュ値(16進数の文字列)に対応する画像データ(見つからない場合はNone)"""
+
+        record = self.find(bytes.fromhex(digest))
+        if record is None:
+            return None
+        _, offset, size, _ = record
+        return self.blob[offset:offset + size]
+
+    def extract(self, output_dir):
+        """全画像を{output_dir}/{ハッシュ値}.{拡張子}として書き出し、件数を返す"""
+
+        os.makedirs(output_dir, exist_ok=True)
+        for digest, offset, size, extension in self.records():
+            with open(f'{output_dir}/{digest.hex()}{extension}', 'wb') as f:
+                f.write(self.blob[offset:offset + size])
+        return self.count
+
+    def close(self):
+        for data in (self.index, self.blob):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self.index_file.close()
+        self.blob_file.close()
@@ -1,19 +1,23 @@
 # 標準ライブラリ
 import csv
-import os
 import re
-from urllib.parse import urljoin
+
+# 自己定義モジュール
+from url_canonicalizer import canonicalize_url
 
 
 class Items(object):
     """スクレイピングデータの受け取り/値取得/整形/ファイル出力/画像出力を定義"""
 
-    def __init__(self, log_handler):
+    def __init__(self, log_handler, plan):
         # log_handlerモジュールのインスタンス化
         self.log_handler = log_handler
+        # 項目ごとの整形処理(抽出計画の整形処理名から1回のみ解決)
+        self.processors = [
+            (key, getattr(self, process)) for key, process in plan.processors]
         # 最終的なスクレイピングデータの格納場所
         self.items = []
-        # 最終的な画僧データの格納場所
+        # 最終的な画僧データの格納場所(画像URLごとのハッシュ値/保存パス等のメタデータ)
         self.img_data = {}
 
     def add_items(self, data):
@@ -33,32 +37,17 @@ class Items(object):
                 f'- {k}: {v}') for k, v in self.data.items()]
 
     def get_content(self, data):
-        """スクレイピングデータから値を取得"""
+        """
+        スクレイピングデータの値の確認
+
+        Note:
+            値(テキスト/属性)は抽出計画により取得済みのため、取得できなかった値のみを補完。
+        """
 
         # スクレイピングデータからkey/valueを順に取り出す
         for key, value in data.items():
-            # keyに応じたvalue(タグ情報)がNoneTypeではない場合
-            if key == 'url' and value:
-                # urlは既に値が代入されているため取得処理不要
-                continue
-            # keyに応じたvalue(スクレイピングデータ)がNoneTypeではない場合
-            elif key == 'title' and value:
-                # valueから値を取得して再代入
-                self.data[key] = value.text
-            elif key == 'price' and value:
-                self.data[key] = value.text
-            elif key == 'star' and value:
-                self.data[key] = value.attrs['class'][1]
-            elif key == 'reviews' and value:
-                self.data[key] = value.text
-            elif key == 'stock' and value:
-                self.data[key] = value.text
-            elif key == 'upc' and value:
-                self.data[key] = value.text
-            elif key == 'image_url' and value:
-                self.data[key] = value.attrs['src']
-            # いずれにも該当しない場合(valueがNoneTypeの場合)
-            else:
+            # valueを取得できなかった場合(タグ/属性がない場合)
+            if value is None:
                 self.log_handler.logger.warning(
                     f'[Get content] "{key}" の取得に失敗しました。(NoneType)'
                 )
@@ -68,11 +57,9 @@ class Items(object):
     def shaping_content(self, data):
         """必要に応じて取得した値の整形/更新"""
 
-        # 該当するkeyに整形処理後のvalueを再代入
-        data['star'] = self.convert_text_to_number(data['star'])
-        data['reviews'] = self.convert_integer(data['reviews'])
-        data['stock'] = self.extract_stock(data['stock'])
-        data['image_url'] = self.convert_image_url(data['image_url'])
+        # 該当するkeyに整形処理後のvalueを再代入(整形処理は抽出計画の定義による)
+        for key, process in self.processors:
+            data[key] = process(data[key])
 
     def delete_meta_str(self, data):
         """特殊文字列の削除"""
@@ -134,45 +121,55 @@ class Items(object):
         return 'none'
 
     def convert_image_url(self, data):
-        """画像の相対URLを絶対URLに変換"""
+        """画像の相対URLを詳細ページのURLを基準に絶対URLに変換(正規化)"""
 
         if data:
-            if re.search(r'\.jpg', data):
-                rel_url = data.replace('../', '')
-                abs_url = urljoin('https://books.toscrape.com/', rel_url)
-                return abs_url
-            else:
+            try:
+                return canonicalize_url(data, self.data['url'])
+            except ValueError:
                 key = [k for k, v in self.data.items() if v == data]
                 self.log_handler.logger.warning(
                     f'* 整形処理失敗 [{key[0]}: {data}]')
                 return 'none'
         return 'none'
 
-    def output_img(self, output_dir, date_time, extension='jpg'):
-        """画像の出力処理"""
-
-        # 引数を組み合わせて画像用の出力ディレクトリを定義
-        img_dir = f'{output_dir}/{date_time}_images'
-        # 画像の出力ディレクトリが存在しない場合
-        if not os.path.exists(img_dir):
-            # ディレクトリを新規作成
-            os.mkdir(img_dir)
-
-        # img_dataからkey(画像の名前)/value(バイト文字列の画像データ)を順に取り出す
-        for title, content in self.img_data.items():
-            # 前述のディレクトリと引数を組み合わせて出力パスを定義/画像出力
-            with open(f'{img_dir}/{title}.{extension}', 'wb') as f:
-                f.write(content)
-
-        self.log_handler.logger.info(f'> 画像データの保存先: {img_dir}')
+    def output_img(self, manifest_path, image_field='image_url'):
+        """
+        画像の出力処理
+
+        Note:
+            画像データは取得時にハッシュ値のパスへ保存済みのため、
+            スクレイピングデータ(url)と画像(ハッシュ値/保存パス)の対応表のみcsvで出力。
+            image_fieldは画像URLの項目名(spiderのスクレイピング項目による)。
+        """
+
+        with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['url', image_field, 'hash', 'path', 'size'])
+            for data in self.items:
+                img = self.img_data.get(data.get(image_field))
+                # 画像を取得できなかった場合
+                if not img:
+                    continue
+                writer.writerow([
+                    data['url'], data[image_field], img['hash'], img['path'], img['size']])
+
+        self.log_handler.logger.info(
+            f'> 画像の対応表: {manifest_path}[{len(self.img_data)}件]')
 
     def output_file(self, output_file_path):
         """ファイル出力処理"""
 
+        # スクレイピングデータがない場合(画像のみを再実行した場合等)
+        if not self.items:
+            self.log_handler.logger.warning('> 出力するスクレイピングデータがありません。')
+            return
+
         # ヘッダー(各列のタイトル)の空リストを定義
         field_name = []
         # リスト内包表記によりスクレイピングデータのkeyをヘッダーとして上記のリストに代入
-        [field_name.append(key) for key in self.data.keys()]
+        # (途中経過から再開した場合も考慮して格納済みの1件目のkeyを使用)
+        [field_name.append(key) for key in self.items[0].keys()]
         # 「csv」ファイル出力
         with open(output_file_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=field_name)
@@ -0,0 +1,189 @@
+# 標準ライブラリ
+import random
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket(object):
+    """
+    ホスト単位の送信間隔をトークンバケットで管理
+
+    Note:
+        トークンはdelay_sec秒ごとに1つ補充され、burstを上限として蓄積。
+        リクエスト1回につきトークンを1つ(乱数化の場合は0.5～1.5)消費し、
+        不足分は補充されるまでの秒数を待機時間として予約。
+        不足分を負のトークンとして保持するため、連続した予約も順番に待機時間が加算される。
+    """
+
+    def __init__(self, delay_sec, burst=1, randomize=False):
+        # トークン1つの補充にかかる秒数(送信間隔)
+        self.delay_sec = delay_sec
+        # トークンの蓄積上限(遅延なしで連続送信できるリクエスト数)
+        self.burst = burst
+        # 消費するトークン数の乱数化
+        self.randomize = randomize
+        # 現在のトークン数
+        self.tokens = burst
+        # トークン数を更新した時刻
+        self.updated = time.monotonic()
+
+    def refill(self):
+        """経過時間に応じたトークンの補充"""
+
+        now = time.monotonic()
+        # 遅延秒数が0の場合は常に上限まで補充
+        if self.delay_sec <= 0:
+            self.tokens = self.burst
+        else:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) / self.delay_sec)
+        self.updated = now
+
+    def reserve(self):
+        """トークンを消費して送信までの待機秒数を返す"""
+
+        self.refill()
+
+        # 乱数化の場合は従来の遅延秒数(0.5倍～1.5倍)と同じ幅で消費量を変動
+        if self.randomize:
+            cost = random.uniform(0.5, 1.5)
+        else:
+            cost = 1
+        self.tokens -= cost
+
+        # トークンが足りている場合は待機不要
+        if self.tokens >= 0:
+            return 0
+        # 不足分が補充されるまでの秒数
+        return -self.tokens * self.delay_sec
+
+
+class AutoThrottle(object):
+    """
+    レイテンシとエラー率に応じた遅延秒数の自動調整
+
+    Note:
+        ホストごとにレイテンシとエラー率(408/5xx)を指数移動平均で保持。
+        目標遅延秒数はレイテンシ/目標同時リクエスト数とし、
+        サーバーが正常な場合は現在値と目標値の平均に近づける(下限はmin_delay)。
+        エラー発生時は遅延秒数を倍に、エラー率が閾値を超えている間は遅延秒数を減らさない。
+    """
+
+    def __init__(
+            self, min_delay, max_delay, target_concurrency=1.0,
+            smoothing=0.3, error_threshold=0.1):
+        # 遅延秒数の下限/上限
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        # 1ホストあたりの目標同時リクエスト数
+        self.target_concurrency = target_concurrency
+        # 指数移動平均の平滑化係数
+        self.smoothing = smoothing
+        # 遅延秒数を減らさないエラー率の閾値
+        self.error_threshold = error_threshold
+        # ホストごとのレイテンシ(指数移動平均)
+        self.latency = {}
+        # ホストごとのエラー率(指数移動平均)
+        self.error_rate = {}
+
+    def moving_average(self, previous, value):
+        """指数移動平均の算出(初回は観測値をそのまま使用)"""
+
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def adjust(self, host, delay, latency, status_code):
+        """観測結果を基に調整後の遅延秒数を返す(エラーの場合はlatencyを使用しない)"""
+
+        # タイムアウト/サーバーエラーの判定
+        is_error = status_code == 408 or 500 <= status_code
+        # エラー率の更新
+        self.error_rate[host] = self.moving_average(
+            self.error_rate.get(host), float(is_error))
+
+        # エラーの場合は遅延秒数を倍に(レイテンシはエラー応答の影響を受けないよう更新しない)
+        if is_error:
+            new_delay = delay * 2
+        else:
+            # レイテンシの更新
+            self.latency[host] = self.moving_average(
+                self.latency.get(host), latency)
+            # 目標遅延秒数
+            target_delay = self.latency[host] / self.target_concurrency
+            # 現在値と目標値の平均に近づける
+            new_delay = (delay + target_delay) / 2
+            # エラー率が高い間は遅延秒数を減らさない
+            if self.error_rate[host] > self.error_threshold:
+                new_delay = max(delay, new_delay)
+
+        # 下限/上限の範囲内に収める
+        return min(self.max_delay, max(self.min_delay, new_delay))
+
+
+class PolitenessScheduler(object):
+    """
+    許可ドメインごとのトークンバケットによるリクエスト送信の管理
+
+    Note:
+        ホストごとにバケットが独立しているため、
+        あるホストの待機中も別のホストへのリクエストは送信可能。
+        予約(reserve)はevent loop上で同期的に行うため排他制御は不要。
+    """
+
+    def __init__(
+            self, allowed_domains, delay_sec, burst=1, randomize=False,
+            auto_throttle=None):
+        # バケットの設定値
+        self.delay_sec = delay_sec
+        self.burst = burst
+        self.randomize = randomize
+        # 遅延秒数の自動調整(Noneの場合は固定)
+        self.auto_throttle = auto_throttle
+        # 許可ドメインごとのバケット
+        self.buckets = {
+            domain: self.create_bucket() for domain in allowed_domains}
+
+    def create_bucket(self):
+        """設定値に応じたバケットの生成"""
+
+        return TokenBucket(self.delay_sec, self.burst, self.randomize)
+
+    def get_host(self, url):
+        """URLに対応する許可ドメイン(バケットのkey)を返す"""
+
+        # URLのホスト名
+        host = urlparse(url).hostname or ''
+        # 許可ドメインに該当する場合はそのドメインをkeyとする
+        for domain in self.buckets:
+            if domain in host:
+                return domain
+        return host
+
+    def get_bucket(self, url):
+        """URLのホストとそのバケットを返す"""
+
+        host = self.get_host(url)
+        # 未登録のホストの場合はバケットを追加
+        if host not in self.buckets:
+            self.buckets[host] = self.create_bucket()
+        return host, self.buckets[host]
+
+    def reserve(self, url):
+        """URLのホストに対して送信を予約し、ホストと待機秒数を返す"""
+
+        host, bucket = self.get_bucket(url)
+        return host, bucket.reserve()
+
+    def record_response(self, url, latency, status_code):
+        """レスポンスの観測結果を遅延秒数の自動調整に反映"""
+
+        # 自動調整を行わない場合
+        if not self.auto_throttle:
+            return
+
+        host, bucket = self.get_bucket(url)
+        # トークンを補充してから送信間隔を更新(変更前の間隔で経過時間を反映)
+        bucket.refill()
+        bucket.delay_sec = self.auto_throttle.adjust(
+            host, bucket.delay_sec, latency, status_code)
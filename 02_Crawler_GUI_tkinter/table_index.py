@@ -0,0 +1,45 @@
+class TableIndex(object):
+    """
+    項目名(th)と値(td)の表の索引
+
+    Note:
+        表を1回だけ走査して{見出しのテキスト: セル}のdictを作成し、
+        各項目の取得はdictの参照のみで行う。
+        (cssセレクターの:-soup-containsのように項目ごとに全てのthを走査しない)
+        BeautifulSoup/lxml_parserモジュールのどちらのタグにも使用できる。
+        resolved_headersには部分一致で検索した見出しの対応を保持するdictを渡し、
+        同じ抽出計画のページ間で共有する(省略時はこの表のみで保持)。
+    """
+
+    def __init__(self, table, resolved_headers=None):
+        # 指定した見出し(部分一致)と表の実際の見出しの対応
+        self.resolved_headers = {} if resolved_headers is None else resolved_headers
+        # 見出しのテキストとセルの対応
+        self.cells = {}
+        for row in table.select('tr'):
+            header = row.select_one('th')
+            cell = row.select_one('th + td')
+            if header and cell:
+                self.cells.setdefault(header.text.strip(), cell)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def get(self, key):
+        """
+        見出しに対応するセルを返す(見つからない場合はNone)
+
+        Note:
+            見出しと完全に一致しない場合は部分一致する見出しを検索し、
+            結果を保持して次のページからはdictの参照のみで取得する。
+        """
+
+        header = self.resolved_headers.get(key, key)
+        if header in self.cells:
+            return self.cells[header]
+
+        for header in self.cells:
+            if key in header:
+                self.resolved_headers[key] = header
+                return self.cells[header]
+        return None